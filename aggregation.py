@@ -0,0 +1,243 @@
+import csv
+import json
+import os
+import re
+
+
+# Popup fields are prefixed with the tab label ("Dati Tecnici_Potenza (kW)"),
+# so they are matched by substring, case-insensitively
+DEFAULT_CAPACITY_FIELDS = ["Potenza"]
+DEFAULT_YEAR_FIELDS = ["Data entrata in esercizio", "Data di entrata in esercizio", "Data esercizio", "Anno"]
+DEFAULT_SOURCE_COLUMN = "column_6"
+
+YEAR_PATTERN = re.compile(r"\b(19\d{2}|20\d{2})\b")
+NUMBER_PATTERN = re.compile(r"-?\d[\d.,]*")
+
+AGGREGATES_FILENAME = "_aggregates.json"
+
+
+def parse_number(text):
+    """
+    Parse a number written in Italian or English notation ("1.234,5", "1234.5", "999 kW")
+
+    Returns:
+        float or None: Parsed value, None if the text has no number
+    """
+    match = NUMBER_PATTERN.search(str(text or ""))
+    if not match:
+        return None
+
+    number = match.group().rstrip(".,")
+    if "," in number and "." in number:
+        # The last separator is the decimal one
+        if number.rfind(",") > number.rfind("."):
+            number = number.replace(".", "").replace(",", ".")
+        else:
+            number = number.replace(",", "")
+    elif "," in number:
+        number = number.replace(",", ".")
+    elif number.count(".") > 1 or re.fullmatch(r"-?[1-9]\d{0,2}\.\d{3}", number):
+        # The site is in Italian: "1.234" is a thousands separator, not a decimal
+        # "0.999" stays a decimal: a thousands group never starts with 0
+        number = number.replace(".", "")
+
+    try:
+        return float(number)
+    except ValueError:
+        return None
+
+
+def _find_field(table_data, patterns):
+    for pattern in patterns:
+        pattern = pattern.lower()
+        for key, value in table_data.items():
+            if pattern in key.lower() and value:
+                return value
+    return None
+
+
+class PlantAggregator:
+    """
+    Running group-by aggregates (per commune) updated as records are emitted.
+    Aggregators built by parallel workers can be combined with merge().
+    """
+
+    def __init__(self, capacity_fields=None, year_fields=None, source_column=DEFAULT_SOURCE_COLUMN):
+        """
+        Args:
+            capacity_fields (list): Popup field name patterns holding the plant capacity
+            year_fields (list): Popup field name patterns holding the commissioning date
+            source_column (str): Grid column holding the plant source
+        """
+        self.capacity_fields = capacity_fields or DEFAULT_CAPACITY_FIELDS
+        self.year_fields = year_fields or DEFAULT_YEAR_FIELDS
+        self.source_column = source_column
+        self.groups = {}
+
+    def _group(self, commune):
+        group = self.groups.get(commune)
+        if group is None:
+            group = self.groups[commune] = {
+                "plants": 0,
+                "total_capacity": 0.0,
+                "plants_with_capacity": 0,
+                "by_source": {},
+                "by_year": {},
+            }
+        return group
+
+    def add(self, record):
+        """
+        Update the aggregates with one record dict
+        """
+        row_data = record.get("row_data") or {}
+        popup_data = record.get("popup_data") or {}
+        table_data = popup_data.get("table_data") or {}
+        commune = (record.get("filters_applied") or {}).get("commune", "")
+
+        group = self._group(commune)
+        group["plants"] += 1
+
+        capacity = parse_number(_find_field(table_data, self.capacity_fields))
+        if capacity is not None:
+            group["total_capacity"] += capacity
+            group["plants_with_capacity"] += 1
+
+        source = row_data.get(self.source_column) or "UNKNOWN"
+        group["by_source"][source] = group["by_source"].get(source, 0) + 1
+
+        year_match = YEAR_PATTERN.search(str(_find_field(table_data, self.year_fields) or ""))
+        year = year_match.group() if year_match else "unknown"
+        group["by_year"][year] = group["by_year"].get(year, 0) + 1
+
+    def merge(self, other):
+        """
+        Add the aggregates of another PlantAggregator into this one
+
+        Returns:
+            PlantAggregator: self, to allow chaining
+        """
+        for commune, other_group in other.groups.items():
+            group = self._group(commune)
+            group["plants"] += other_group["plants"]
+            group["total_capacity"] += other_group["total_capacity"]
+            group["plants_with_capacity"] += other_group["plants_with_capacity"]
+            for key in ("by_source", "by_year"):
+                for value, count in other_group[key].items():
+                    group[key][value] = group[key].get(value, 0) + count
+        return self
+
+    @property
+    def total_plants(self):
+        return sum(group["plants"] for group in self.groups.values())
+
+    def to_dict(self):
+        return {
+            "capacity_fields": self.capacity_fields,
+            "year_fields": self.year_fields,
+            "source_column": self.source_column,
+            "groups": self.groups,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        aggregator = cls(data.get("capacity_fields"), data.get("year_fields"),
+                         data.get("source_column", DEFAULT_SOURCE_COLUMN))
+        aggregator.groups = data.get("groups", {})
+        return aggregator
+
+    def save(self, path):
+        """
+        Save the aggregate state as JSON, so runs can be resumed or merged later
+        """
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+    def summary_rows(self):
+        """
+        Returns:
+            dict: Table name -> list of row dicts (by_commune, by_source, by_year)
+        """
+        by_commune, by_source, by_year = [], [], []
+        for commune in sorted(self.groups):
+            group = self.groups[commune]
+            by_commune.append({
+                "commune": commune,
+                "plants": group["plants"],
+                "total_capacity": round(group["total_capacity"], 3),
+                "plants_with_capacity": group["plants_with_capacity"],
+            })
+            for source, count in sorted(group["by_source"].items()):
+                by_source.append({"commune": commune, "source": source, "plants": count})
+            for year, count in sorted(group["by_year"].items()):
+                by_year.append({"commune": commune, "year": year, "plants": count})
+        return {"by_commune": by_commune, "by_source": by_source, "by_year": by_year}
+
+    def write_report(self, output_directory, formats=("csv", "md")):
+        """
+        Write the summary tables in the requested formats
+
+        Args:
+            output_directory (str): Directory where to write the report
+            formats (iterable): Any of "csv", "parquet", "md"
+
+        Returns:
+            list: Paths of the written files
+        """
+        os.makedirs(output_directory, exist_ok=True)
+        tables = self.summary_rows()
+        written = []
+
+        for report_format in formats:
+            if report_format == "md":
+                path = os.path.join(output_directory, "summary.md")
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(self.to_markdown(tables))
+                written.append(path)
+                continue
+
+            for name, rows in tables.items():
+                path = os.path.join(output_directory, f"summary_{name}.{report_format}")
+                if report_format == "csv":
+                    with open(path, 'w', encoding='utf-8', newline='') as f:
+                        writer = csv.DictWriter(f, fieldnames=list(rows[0].keys()) if rows else ["commune"])
+                        writer.writeheader()
+                        writer.writerows(rows)
+                elif report_format == "parquet":
+                    import pandas as pd
+                    pd.DataFrame(rows).to_parquet(path, index=False)
+                else:
+                    raise ValueError(f"Unknown report format: {report_format}")
+                written.append(path)
+
+        return written
+
+    def to_markdown(self, tables=None):
+        tables = tables or self.summary_rows()
+        titles = {
+            "by_commune": "Plants by commune",
+            "by_source": "Plants by source",
+            "by_year": "Plants by commissioning year",
+        }
+
+        lines = ["# Extraction summary", "", f"Total plants: {self.total_plants}", ""]
+        for name, rows in tables.items():
+            lines.append(f"## {titles[name]}")
+            lines.append("")
+            if not rows:
+                lines.extend(["No data.", ""])
+                continue
+            headers = list(rows[0].keys())
+            lines.append("| " + " | ".join(headers) + " |")
+            lines.append("| " + " | ".join("---" for _ in headers) + " |")
+            for row in rows:
+                lines.append("| " + " | ".join(str(row[header]) for header in headers) + " |")
+            lines.append("")
+        return "\n".join(lines)
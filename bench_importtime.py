@@ -0,0 +1,97 @@
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+
+# Subcommands that must start without loading the crawler stack
+DEFAULT_COMMANDS = ["validate-config", "stats", "report", "plan"]
+FORBIDDEN_MODULES = ["selenium", "requests", "pandas"]
+# Exit codes that do not mean the command crashed: validate-config fails on an
+# invalid config and report fails when the output directory has no records
+EXPECTED_EXIT_CODES = {"validate-config": {0, 1}, "report": {0, 1}}
+
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def measure_command(command, python=sys.executable):
+    """
+    Run a main.py subcommand under `python -X importtime` and parse the report
+
+    Args:
+        command (str): Subcommand name (e.g., "validate-config")
+        python (str): Python interpreter to use
+
+    Returns:
+        tuple: (total_ms, modules, returncode, errors) with the cumulative import time
+        of top-level imports in milliseconds, the set of imported module names, the
+        exit code of the command and its stderr without the importtime report
+    """
+    main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    result = subprocess.run(
+        [python, "-X", "importtime", main_path, command],
+        capture_output=True, text=True
+    )
+
+    total_us = 0
+    modules = set()
+    errors = []
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            if not line.startswith("import time:"):
+                errors.append(line)
+            continue
+        _, cumulative, indent, name = match.groups()
+        modules.add(name)
+        # Top-level imports have a single space of indentation
+        if len(indent) == 1:
+            total_us += int(cumulative)
+
+    return total_us / 1000, modules, result.returncode, "\n".join(errors)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the cold start import time of the non-crawl CLI commands")
+    parser.add_argument("--budget-ms", type=float, default=150.0, help="Maximum import time per command")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per command, the best one is kept")
+    parser.add_argument("commands", nargs="*", default=DEFAULT_COMMANDS)
+    args = parser.parse_args(argv)
+
+    failed = False
+    for command in args.commands:
+        timings = []
+        modules = set()
+        for _ in range(max(1, args.runs)):
+            total_ms, modules, returncode, errors = measure_command(command)
+            timings.append(total_ms)
+        best_ms = min(timings)
+
+        # A command that crashes early would look fast, so its timing is not trusted
+        if returncode not in EXPECTED_EXIT_CODES.get(command, {0}):
+            print(f"❌ {command}: exited with code {returncode}")
+            for line in errors.splitlines()[-10:]:
+                print(f"   {line}")
+            failed = True
+            continue
+
+        heavy_roots = sorted({
+            name.split(".")[0] for name in modules
+            if name.split(".")[0] in FORBIDDEN_MODULES
+        })
+
+        status = "✅"
+        if best_ms > args.budget_ms or heavy_roots:
+            status = "❌"
+            failed = True
+
+        print(f"{status} {command}: {best_ms:.1f} ms (budget {args.budget_ms:.0f} ms)")
+        if heavy_roots:
+            print(f"   ⚠️ Heavy modules imported: {', '.join(heavy_roots)}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+import sys
+from dataclasses import dataclass
+
+
+# Field names ("Dati Tecnici_Potenza", "column_6", ...) repeat in every record;
+# schemas map a tuple of names to a single shared, interned tuple object
+_schemas = {}
+_filter_contexts = {}
+
+
+def intern_schema(names):
+    """
+    Return a shared tuple of interned field names, one object per distinct schema
+    """
+    key = tuple(names)
+    schema = _schemas.get(key)
+    if schema is None:
+        schema = tuple(sys.intern(name) for name in key)
+        _schemas[schema] = schema
+    return schema
+
+
+def intern_values(values):
+    """
+    Tuple of values with short strings interned; categorical values such as
+    "BIOGAS" or "In esercizio" are then stored once for the whole crawl
+    """
+    return tuple(sys.intern(value) if isinstance(value, str) and len(value) <= 40 else value
+                 for value in values)
+
+
+@dataclass(frozen=True)
+class FilterContext:
+    __slots__ = ("region", "province", "commune")
+
+    region: str
+    province: str
+    commune: str
+
+    @classmethod
+    def shared(cls, filters_applied):
+        """
+        Return the single FilterContext instance for these filters
+        """
+        key = (filters_applied.get("region", ""), filters_applied.get("province", ""),
+               filters_applied.get("commune", ""))
+        context = _filter_contexts.get(key)
+        if context is None:
+            context = cls(*key)
+            _filter_contexts[key] = context
+        return context
+
+    def to_dict(self):
+        return {"region": self.region, "province": self.province, "commune": self.commune}
+
+    def __reduce__(self):
+        # Frozen slots dataclasses cannot be restored by the default pickle/copy
+        # protocol (it assigns the slots); rebuild through shared() instead, which
+        # also keeps one instance per filter set in the unpickling process
+        return (self.__class__.shared, (self.to_dict(),))
+
+
+@dataclass
+class CompactRecord:
+    """
+    Memory-efficient equivalent of the record dict built by extract_complete_data:
+    keys are stored once per schema, values in tuples and filters in a shared context
+    """
+    __slots__ = ("click_number", "row_keys", "row_values", "title", "geometry_point",
+                 "coordinate_x", "coordinate_y", "field_names", "field_values", "filters")
+
+    click_number: int
+    row_keys: tuple
+    row_values: tuple
+    title: str
+    geometry_point: str
+    coordinate_x: float
+    coordinate_y: float
+    field_names: tuple
+    field_values: tuple
+    filters: FilterContext
+
+    @classmethod
+    def from_dict(cls, record):
+        """
+        Build a compact record from a record dict
+
+        Args:
+            record (dict): Record with click_number, row_data, popup_data and filters_applied
+
+        Returns:
+            CompactRecord: Compact representation of the record
+        """
+        row_data = record.get("row_data") or {}
+        popup_data = record.get("popup_data") or {}
+        table_data = popup_data.get("table_data") or {}
+
+        return cls(
+            click_number=record.get("click_number", 0),
+            row_keys=intern_schema(row_data.keys()),
+            row_values=intern_values(row_data.values()),
+            title=popup_data.get("title", ""),
+            geometry_point=popup_data.get("geometry_point", ""),
+            coordinate_x=popup_data.get("coordinate_x"),
+            coordinate_y=popup_data.get("coordinate_y"),
+            field_names=intern_schema(table_data.keys()),
+            field_values=intern_values(table_data.values()),
+            filters=FilterContext.shared(record.get("filters_applied") or {}),
+        )
+
+    def to_dict(self):
+        """
+        Rebuild the original record dict (same layout as the saved JSON files)
+        """
+        return {
+            "click_number": self.click_number,
+            "row_data": dict(zip(self.row_keys, self.row_values)),
+            "popup_data": {
+                "title": self.title,
+                "table_data": dict(zip(self.field_names, self.field_values)),
+                "geometry_point": self.geometry_point,
+                "coordinate_x": self.coordinate_x,
+                "coordinate_y": self.coordinate_y
+            },
+            "filters_applied": self.filters.to_dict()
+        }
+
+    def flat_items(self):
+        """
+        Yield (column, value) pairs named like pandas.json_normalize(records, sep='.')
+        """
+        yield "click_number", self.click_number
+        for key, value in zip(self.row_keys, self.row_values):
+            yield f"row_data.{key}", value
+        yield "popup_data.title", self.title
+        for key, value in zip(self.field_names, self.field_values):
+            yield f"popup_data.table_data.{key}", value
+        yield "popup_data.geometry_point", self.geometry_point
+        yield "popup_data.coordinate_x", self.coordinate_x
+        yield "popup_data.coordinate_y", self.coordinate_y
+        yield "filters_applied.region", self.filters.region
+        yield "filters_applied.province", self.filters.province
+        yield "filters_applied.commune", self.filters.commune
+
+
+# Columns with few distinct values, stored dictionary-encoded in Arrow
+DICTIONARY_COLUMNS = ("filters_applied.region", "filters_applied.province", "filters_applied.commune")
+
+
+class ArrowRecordBatchBuilder:
+    """
+    Accumulates records into Arrow record batches of batch_size rows, so a large
+    crawl is held in columnar buffers and converts to a DataFrame without copying
+    """
+
+    def __init__(self, batch_size=1000):
+        import pyarrow  # Optional dependency, only needed for this builder
+
+        self.pa = pyarrow
+        self.batch_size = max(1, int(batch_size))
+        self.tables = []
+        self.columns = {}
+        self.pending = 0
+
+    def append(self, record):
+        """
+        Add a record dict or CompactRecord
+        """
+        if not isinstance(record, CompactRecord):
+            record = CompactRecord.from_dict(record)
+
+        for name, value in record.flat_items():
+            column = self.columns.get(name)
+            if column is None:
+                column = self.columns[sys.intern(name)] = [None] * self.pending
+            column.append(value)
+        self.pending += 1
+
+        # Columns missing from this record
+        for column in self.columns.values():
+            if len(column) < self.pending:
+                column.append(None)
+
+        if self.pending >= self.batch_size:
+            self._flush()
+
+    def _flush(self):
+        if not self.pending:
+            return
+        arrays = {}
+        for name, values in self.columns.items():
+            array = self.pa.array(values)
+            if name in DICTIONARY_COLUMNS:
+                array = array.dictionary_encode()
+            arrays[name] = array
+        self.tables.append(self.pa.table(arrays))
+        self.columns = {}
+        self.pending = 0
+
+    def __len__(self):
+        return sum(table.num_rows for table in self.tables) + self.pending
+
+    def finish(self):
+        """
+        Return all appended records as a single pyarrow.Table
+        """
+        self._flush()
+        if not self.tables:
+            return self.pa.table({})
+        if len(self.tables) == 1:
+            return self.tables[0]
+        try:
+            table = self.pa.concat_tables(self.tables, promote_options="default")
+        except TypeError:  # pyarrow < 14
+            table = self.pa.concat_tables(self.tables, promote=True)
+        self.tables = [table]
+        return table
+
+    def to_dataframe(self):
+        """
+        Convert to an Arrow-backed pandas DataFrame without copying the buffers
+        """
+        import pandas as pd
+
+        return self.finish().to_pandas(types_mapper=pd.ArrowDtype)
+
+
+class RecordStore:
+    """
+    List-like container of CompactRecord, used in place of the list of record
+    dicts returned by extract_complete_data on large crawls
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def append(self, record):
+        if not isinstance(record, CompactRecord):
+            record = CompactRecord.from_dict(record)
+        self.records.append(record)
+
+    def clear(self):
+        self.records.clear()
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        """
+        Yield the records as dicts, like the regular extracted_data list
+        """
+        for record in self.records:
+            yield record.to_dict()
+
+    def to_arrow(self, batch_size=1000):
+        """
+        Build a pyarrow.Table with one row per record (requires pyarrow)
+        """
+        builder = ArrowRecordBatchBuilder(batch_size=batch_size)
+        for record in self.records:
+            builder.append(record)
+        return builder.finish()
+
+    def to_dataframe(self):
+        """
+        Convert to a pandas DataFrame with the same columns as pandas.json_normalize(records, sep='.');
+        Arrow-backed when pyarrow is installed
+        """
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            import pandas as pd
+            return pd.DataFrame([dict(record.flat_items()) for record in self.records])
+
+        import pandas as pd
+        return self.to_arrow().to_pandas(types_mapper=pd.ArrowDtype)
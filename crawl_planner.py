@@ -0,0 +1,337 @@
+import heapq
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+
+
+METRICS_FILENAME = "crawl_metrics.json"
+
+# Used when nothing is known about a commune: seconds per grid row and per job
+DEFAULT_SECONDS_PER_ROW = 10.0
+DEFAULT_JOB_SECONDS = 600.0
+
+
+@dataclass
+class CrawlJob:
+    """
+    A commune to crawl, or a row range of it when the planner splits a large commune
+    """
+    region: str
+    province: str
+    commune: str
+    row_range: tuple = None
+    estimated_seconds: float = DEFAULT_JOB_SECONDS
+    cost_source: str = "default"
+    rows: int = None
+    part: int = 0
+    parts: int = 1
+    output_directory: str = ""
+    result: dict = field(default_factory=dict)
+
+    @property
+    def key(self):
+        return job_key(self.region, self.province, self.commune)
+
+    @property
+    def label(self):
+        label = f"{self.region} > {self.province} > {self.commune}"
+        if self.parts > 1:
+            label += f" [{self.part + 1}/{self.parts} rows {self.row_range[0]}-{self.row_range[1] - 1}]"
+        return label
+
+
+def job_key(region, province, commune):
+    return f"{region}|{province}|{commune}"
+
+
+def jobs_from_config(config):
+    """
+    Build the job list from config.yml: a 'jobs' list of regione/provincia/comune
+    mappings, or the single regione/provincia/comune keys
+
+    Returns:
+        list: CrawlJob instances in config order
+    """
+    entries = config.get('jobs') or [config]
+    return [CrawlJob(entry.get('regione', ''), entry.get('provincia', ''), entry.get('comune', ''))
+            for entry in entries]
+
+
+def load_metrics(path):
+    """
+    Load per-commune metrics of previous runs
+
+    Returns:
+        dict: job key -> {"rows": int, "records": int, "seconds": float}
+    """
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not read crawl metrics {path}: {e}")
+        return {}
+
+
+def save_metrics(path, metrics):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(metrics, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def seconds_per_row(metrics):
+    """
+    Average crawl time per grid row over all previous runs
+    """
+    rows = sum(entry.get("rows") or 0 for entry in metrics.values() if entry.get("seconds"))
+    seconds = sum(entry.get("seconds") or 0 for entry in metrics.values() if entry.get("rows"))
+    return seconds / rows if rows else DEFAULT_SECONDS_PER_ROW
+
+
+def estimate_costs(jobs, metrics, row_counts=None):
+    """
+    Estimate the crawl time of each job, from the best available source:
+    previous run of the same commune, then row-count probe, then a default
+
+    Args:
+        jobs (list): CrawlJob instances
+        metrics (dict): Metrics of previous runs (see load_metrics)
+        row_counts (dict): job key -> row count from probe_row_count
+    """
+    row_counts = row_counts or {}
+    per_row = seconds_per_row(metrics)
+
+    for job in jobs:
+        history = metrics.get(job.key) or {}
+        job.rows = row_counts.get(job.key, history.get("rows"))
+
+        if history.get("seconds"):
+            job.estimated_seconds = history["seconds"]
+            job.cost_source = "history"
+        elif job.rows is not None:
+            job.estimated_seconds = job.rows * per_row
+            job.cost_source = "probe"
+        else:
+            job.estimated_seconds = DEFAULT_JOB_SECONDS
+            job.cost_source = "default"
+
+
+def split_job(job, parts):
+    """
+    Split a job with a known row count into contiguous row-range sub-jobs
+    """
+    size = math.ceil(job.rows / parts)
+    sub_jobs = []
+    for part in range(parts):
+        start = part * size
+        end = min(job.rows, start + size)
+        if start >= end:
+            break
+        sub_jobs.append(CrawlJob(
+            job.region, job.province, job.commune,
+            row_range=(start, end),
+            estimated_seconds=job.estimated_seconds * (end - start) / job.rows,
+            cost_source=job.cost_source,
+            rows=end - start,
+            part=part,
+        ))
+    for sub_job in sub_jobs:
+        sub_job.parts = len(sub_jobs)
+    return sub_jobs
+
+
+def plan_jobs(jobs, workers, max_split=4):
+    """
+    Split communes longer than the ideal per-worker load into row-range
+    sub-jobs, then order everything longest-first (LPT scheduling)
+
+    Args:
+        jobs (list): CrawlJob instances with estimated costs
+        workers (int): Number of parallel browsers
+        max_split (int): Maximum number of sub-jobs per commune
+
+    Returns:
+        list: Jobs in the order they should be submitted
+    """
+    workers = max(1, workers)
+    target = sum(job.estimated_seconds for job in jobs) / workers
+
+    planned = []
+    for job in jobs:
+        parts = min(max_split, math.ceil(job.estimated_seconds / target)) if target else 1
+        # Only jobs with a known row count can be split
+        if workers > 1 and parts > 1 and job.rows:
+            planned.extend(split_job(job, min(parts, job.rows)))
+        else:
+            planned.append(job)
+
+    return sorted(planned, key=lambda job: job.estimated_seconds, reverse=True)
+
+
+def predict_makespan(jobs, workers):
+    """
+    Simulate the list scheduling of jobs (in order) on the workers
+
+    Returns:
+        float: Predicted total wall time in seconds
+    """
+    loads = [0.0] * max(1, workers)
+    for job in jobs:
+        heapq.heappush(loads, heapq.heappop(loads) + job.estimated_seconds)
+    return max(loads)
+
+
+def run_job(job, crawl_options):
+    """
+    Crawl one job in a worker process with its own browser
+
+    Returns:
+        dict: records, failed_records, grid_rows, seconds and completed (False when
+        the crawl failed or stopped early)
+    """
+    from scraper_simplified import extract_complete_data, set_selector_map
+    from resource_watchdog import ResourceWatchdog
+    from aggregation import PlantAggregator
+    from site_selectors import SelectorMap
+
+    options = dict(crawl_options)
+    selectors_file = options.pop('selectors_file', None)
+    if selectors_file:
+        set_selector_map(SelectorMap.from_file(selectors_file))
+    watchdog = ResourceWatchdog.from_config(options.pop('watchdog', None))
+    report_config = options.pop('report', None) or {}
+    aggregator = PlantAggregator(report_config.get('capacity_fields'), report_config.get('year_fields'))
+
+    run_stats = {}
+    started = time.monotonic()
+    total_records, _ = extract_complete_data(
+        job.region, job.province, job.commune, job.output_directory,
+        watchdog=watchdog, keep_records=False, aggregator=aggregator,
+        row_range=job.row_range, run_stats=run_stats, **options
+    )
+    return {
+        "records": total_records,
+        "failed_records": run_stats.get("failed_records", 0),
+        "grid_rows": run_stats.get("grid_rows"),
+        "seconds": time.monotonic() - started,
+        "completed": run_stats.get("completed", False),
+    }
+
+
+def _probe(job):
+    from scraper_simplified import probe_row_count
+
+    return probe_row_count(job.region, job.province, job.commune)
+
+
+def probe_row_counts(jobs, workers):
+    """
+    Count the grid rows of each job in parallel browsers (filters only, no popups)
+
+    Returns:
+        dict: job key -> row count, for the probes that succeeded
+    """
+    row_counts = {}
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(_probe, job): job for job in jobs}
+        for future in as_completed(futures):
+            try:
+                rows = future.result()
+            except Exception as e:
+                print(f"⚠️ Probe failed for {futures[future].label}: {e}")
+                continue
+            if rows is not None:
+                row_counts[futures[future].key] = rows
+    return row_counts
+
+
+def assign_output_directories(jobs, output_root):
+    for job in jobs:
+        name = "_".join(part.replace(os.sep, "-") for part in (job.region, job.province, job.commune))
+        if job.parts > 1:
+            name += f"_part{job.part + 1}"
+        job.output_directory = os.path.join(output_root, name)
+
+
+def run_plan(jobs, workers, output_root, crawl_options=None):
+    """
+    Run the planned jobs on a pool of worker processes, submitting them in plan order
+
+    Args:
+        jobs (list): Jobs returned by plan_jobs
+        workers (int): Number of parallel browsers
+        output_root (str): Directory containing one output directory per job
+        crawl_options (dict): Extra keyword arguments for extract_complete_data,
+            plus the 'watchdog' and 'report' config sections
+
+    Returns:
+        float: Actual makespan in seconds
+    """
+    crawl_options = crawl_options or {}
+    assign_output_directories(jobs, output_root)
+
+    started = time.monotonic()
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(run_job, job, crawl_options): job for job in jobs}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                job.result = future.result()
+                status = "✅ Finished" if job.result["completed"] else "⚠️ Stopped early"
+                print(f"{status} {job.label}: {job.result['records']} records in {job.result['seconds']:.0f}s")
+            except Exception as e:
+                job.result = {"error": str(e)}
+                print(f"❌ Job {job.label} failed: {e}")
+
+    return time.monotonic() - started
+
+
+def update_metrics(metrics, jobs):
+    """
+    Record the measured time and row count of every completed commune for the next runs.
+    Failed or interrupted crawls say nothing about the cost of a commune and are left
+    out, so they never replace the history of a good run. Completed crawls without
+    any saved record are kept: scanning their rows still takes time.
+    """
+    by_key = {}
+    for job in jobs:
+        result = job.result
+        if (not result or "error" in result or not result.get("completed")
+                or result.get("grid_rows") is None):
+            continue
+        entry = by_key.setdefault(job.key, {"rows": None, "range_rows": 0, "records": 0, "seconds": 0.0, "parts": 0})
+        entry["records"] += job.result["records"]
+        entry["seconds"] += job.result["seconds"]
+        entry["parts"] += 1
+        entry["range_rows"] += job.rows or 0
+        # grid_rows is the row count of the whole commune, also for sub-jobs
+        entry["rows"] = job.result.get("grid_rows") or entry["rows"]
+
+    for key, entry in by_key.items():
+        # Partially failed communes would underestimate the cost, keep the previous value
+        expected_parts = next(job.parts for job in jobs if job.key == key)
+        if entry["parts"] < expected_parts:
+            continue
+        metrics[key] = {"rows": entry["rows"] or entry["range_rows"] or None, "records": entry["records"], "seconds": round(entry["seconds"], 1)}
+    return metrics
+
+
+def print_plan(jobs, workers):
+    print(f"🗺️ CRAWL PLAN ({len(jobs)} jobs, {workers} workers):")
+    for job in jobs:
+        rows = f"{job.rows} rows" if job.rows is not None else "rows unknown"
+        print(f"   ⏱️ {job.estimated_seconds:7.0f}s  {job.label} ({rows}, {job.cost_source})")
+    print(f"   📈 Predicted makespan: {predict_makespan(jobs, workers):.0f}s")
+
+
+def print_makespan_report(jobs, workers, actual_seconds):
+    predicted = predict_makespan(jobs, workers)
+    print(f"📈 MAKESPAN: predicted {predicted:.0f}s, actual {actual_seconds:.0f}s")
+    for job in jobs:
+        if job.result and "seconds" in job.result:
+            print(f"   {job.label}: predicted {job.estimated_seconds:.0f}s, actual {job.result['seconds']:.0f}s")
@@ -1,68 +1,429 @@
 import yaml
 import os
-from typing import Dict, Any
-from scraper_simplified import extract_complete_data
+import sys
+import glob
+import json
+import argparse
+from typing import Dict, Any, Iterator
 
-def load_config() -> Dict[str, Any]:
+# Heavy dependencies (selenium, requests, pandas) are imported inside the
+# subcommand that needs them, so validate-config and stats start instantly.
+
+DEFAULT_OUTPUT_DIRECTORY = "extracted_data"
+DEFAULT_REPORT_FORMATS = ["csv", "md"]
+
+
+def load_config(config_path: str = None) -> Dict[str, Any]:
     """
     Loads configuration values from the config.yml file
-    
+
+    Args:
+        config_path (str): Path to the configuration file, defaults to config.yml next to this script
+
     Returns:
         dict: Dictionary with configuration values
     """
-    config_path = os.path.join(os.path.dirname(__file__), 'config.yml')
-    
+    if config_path is None:
+        config_path = os.path.join(os.path.dirname(__file__), 'config.yml')
+
     try:
         with open(config_path, 'r', encoding='utf-8') as file:
             config = yaml.safe_load(file)
-        return config
+        return config or {}
     except FileNotFoundError:
         raise FileNotFoundError(f"Configuration file not found at: {config_path}")
     except yaml.YAMLError as e:
         raise ValueError(f"Error parsing YAML file: {e}")
 
-def get_config_variables():
+def get_config_variables(config: Dict[str, Any] = None):
     """
     Gets values from config.yml and stores them in variables
-    
+
+    Args:
+        config (dict): Already loaded configuration, loaded from config.yml if None
+
     Returns:
         tuple: (regione, provincia, comune)
     """
-    config = load_config()
-    
+    if config is None:
+        config = load_config()
+
     # Extract configuration values
     regione = config.get('regione', '')
     provincia = config.get('provincia', '')
     comune = config.get('comune', '')
-    
+
     # Optional: print loaded values
     print(f"Configuration loaded:")
     print(f"  Regione: {regione}")
     print(f"  Provincia: {provincia}")
     print(f"  Comune: {comune}")
-    
+
     return regione, provincia, comune
 
-# Usage example
-if __name__ == "__main__":
+def validate_config(config: Dict[str, Any]) -> list:
+    """
+    Checks the configuration without starting the browser
+
+    Args:
+        config (dict): Loaded configuration
+
+    Returns:
+        list: Error messages, empty if the configuration is valid
+    """
+    errors = []
+
+    jobs = config.get('jobs')
+    if jobs is not None:
+        if not isinstance(jobs, list) or not jobs:
+            errors.append("'jobs' must be a non-empty list")
+            jobs = []
+        for index, job in enumerate(jobs):
+            for key in ('regione', 'provincia', 'comune'):
+                value = job.get(key) if isinstance(job, dict) else None
+                if not isinstance(value, str) or not value.strip():
+                    errors.append(f"jobs[{index}]: '{key}' must be a non-empty string")
+    else:
+        for key in ('regione', 'provincia', 'comune'):
+            value = config.get(key)
+            if not isinstance(value, str) or not value.strip():
+                errors.append(f"'{key}' must be a non-empty string")
+
+    for key in ('workers', 'max_split'):
+        value = config.get(key, 1)
+        if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+            errors.append(f"'{key}' must be a positive integer")
+
+    pipeline_workers = config.get('pipeline_workers', 0)
+    if not isinstance(pipeline_workers, int) or isinstance(pipeline_workers, bool) or pipeline_workers < 0:
+        errors.append("'pipeline_workers' must be a non-negative integer")
+
+    if not isinstance(config.get('compact_records', False), bool):
+        errors.append("'compact_records' must be true or false")
+
+    report_config = config.get('report')
+    if report_config is not None:
+        if not isinstance(report_config, dict):
+            errors.append("'report' must be a mapping")
+        else:
+            for report_format in report_config.get('formats', DEFAULT_REPORT_FORMATS):
+                if report_format not in ('csv', 'parquet', 'md'):
+                    errors.append(f"Unknown report format '{report_format}'")
+            for key in ('capacity_fields', 'year_fields'):
+                if key in report_config and not isinstance(report_config[key], list):
+                    errors.append(f"Report option '{key}' must be a list of field names")
+
+    watchdog_config = config.get('watchdog')
+    if watchdog_config is not None:
+        if not isinstance(watchdog_config, dict):
+            errors.append("'watchdog' must be a mapping")
+        else:
+            import inspect
+            from resource_watchdog import ResourceWatchdog
+
+            allowed = set(inspect.signature(ResourceWatchdog.__init__).parameters) - {'self'}
+            for key, value in watchdog_config.items():
+                if key not in allowed:
+                    errors.append(f"Unknown watchdog option '{key}'")
+                elif not isinstance(value, (int, float)) or isinstance(value, bool) or value <= 0:
+                    errors.append(f"Watchdog option '{key}' must be a positive number")
+
+    from site_selectors import SelectorMap, validate_definitions
+
+    selectors_file = config.get('selectors_file')
+    if selectors_file:
+        try:
+            selector_map = SelectorMap.from_file(selectors_file)
+        except (OSError, ValueError) as e:
+            errors.append(f"Could not load selectors file '{selectors_file}': {e}")
+        else:
+            errors.extend(validate_definitions(selector_map.definitions))
+    else:
+        errors.extend(validate_definitions(SelectorMap().definitions))
+
+    return errors
+
+def iter_saved_records(output_directory: str) -> Iterator[Dict[str, Any]]:
+    """
+    Reads the record_*.json files saved by a crawl, including the per-job
+    subdirectories written by planned crawls
+
+    Args:
+        output_directory (str): Directory where the JSON records were saved
+
+    Yields:
+        dict: One record per file, in click order within each directory
+    """
+    pattern = os.path.join(glob.escape(output_directory), "**", "record_*.json")
+    for filepath in sorted(glob.glob(pattern, recursive=True)):
+        try:
+            with open(filepath, 'r', encoding='utf-8') as f:
+                yield json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Skipping unreadable record {filepath}: {e}")
+
+def plan_from_config(config, output_directory, probe=False):
+    import crawl_planner
+
+    workers = config.get('workers', 1)
+    jobs = crawl_planner.jobs_from_config(config)
+    metrics = crawl_planner.load_metrics(os.path.join(output_directory, crawl_planner.METRICS_FILENAME))
+
+    row_counts = {}
+    if probe:
+        unknown = [job for job in jobs if job.key not in metrics]
+        if unknown:
+            print(f"🔎 Probing row counts of {len(unknown)} commune(s)...")
+            row_counts = crawl_planner.probe_row_counts(unknown, workers)
+
+    crawl_planner.estimate_costs(jobs, metrics, row_counts)
+    return crawl_planner.plan_jobs(jobs, workers, config.get('max_split', 4)), metrics, workers
+
+def command_plan(args) -> int:
+    config = load_config(args.config)
+    from crawl_planner import print_plan
+
+    jobs, _, workers = plan_from_config(config, args.output, probe=args.probe)
+    print_plan(jobs, workers)
+    return 0
+
+def crawl_planned(args, config) -> int:
+    import crawl_planner
+    from aggregation import PlantAggregator, AGGREGATES_FILENAME
+
+    output_root = args.output
+    os.makedirs(output_root, exist_ok=True)
+    jobs, metrics, workers = plan_from_config(config, output_root, probe=args.probe)
+    crawl_planner.print_plan(jobs, workers)
+
+    pipeline_workers = args.pipeline_workers if args.pipeline_workers is not None else config.get('pipeline_workers', 0)
+    crawl_options = {
+        'watchdog': config.get('watchdog'),
+        'report': config.get('report'),
+        'pipeline_workers': pipeline_workers,
+        'compact_records': bool(config.get('compact_records', False)),
+        'selectors_file': config.get('selectors_file'),
+        'resume': args.resume,
+    }
+    actual_seconds = crawl_planner.run_plan(jobs, workers, output_root, crawl_options)
+
+    crawl_planner.print_makespan_report(jobs, workers, actual_seconds)
+    crawl_planner.save_metrics(os.path.join(output_root, crawl_planner.METRICS_FILENAME),
+                               crawl_planner.update_metrics(metrics, jobs))
+
+    # Each job kept its own aggregates, the merged summary comes without a second pass.
+    # Only jobs that ran to completion in this run, so a stale file of an earlier run is never merged
+    report_config = config.get('report') or {}
+    aggregator = PlantAggregator(report_config.get('capacity_fields'), report_config.get('year_fields'))
+    for job in jobs:
+        if not job.result.get('completed'):
+            continue
+        aggregates_path = os.path.join(job.output_directory, AGGREGATES_FILENAME)
+        if os.path.exists(aggregates_path):
+            aggregator.merge(PlantAggregator.load(aggregates_path))
+
+    total_records = sum(job.result.get('records', 0) for job in jobs)
+    failed_records = sum(job.result.get('failed_records', 0) for job in jobs)
+    print(f"\n🎯 EXTRACTION SUMMARY:")
+    print(f"   ✅ Total records extracted: {total_records}")
+    if failed_records:
+        print(f"   ❌ Records not saved: {failed_records}")
+    print(f"   📁 Data saved in: {output_root}")
+    # Merged state at the root, so report/stats on output_root see the whole crawl
+    aggregator.save(os.path.join(output_root, AGGREGATES_FILENAME))
+    if aggregator.total_plants:
+        for path in aggregator.write_report(output_root, report_config.get('formats', DEFAULT_REPORT_FORMATS)):
+            print(f"   📊 Report: {path}")
+
+    return 0 if total_records > 0 else 1
+
+def command_crawl(args) -> int:
+    from scraper_simplified import extract_complete_data, set_selector_map
+    from resource_watchdog import ResourceWatchdog
+    from site_selectors import SelectorMap
+    from aggregation import PlantAggregator
+
     # Load configuration variables
-    regione, provincia, comune = get_config_variables()
-    
+    config = load_config(args.config)
+    if config.get('selectors_file'):
+        set_selector_map(SelectorMap.from_file(config['selectors_file']))
+
+    # Several communes or browsers: schedule them with the crawl planner
+    if config.get('jobs') or config.get('workers', 1) > 1:
+        return crawl_planned(args, config)
+    regione, provincia, comune = get_config_variables(config)
+    watchdog = ResourceWatchdog.from_config(config.get('watchdog'))
+    report_config = config.get('report') or {}
+    aggregator = PlantAggregator(report_config.get('capacity_fields'), report_config.get('year_fields'))
+
     # Set output directory
-    output_directory = "extracted_data"
-    
+    output_directory = args.output
+
     # Extract data using the simplified scraper
     print(f"\nStarting data extraction...")
-    total_records, data = extract_complete_data(regione, provincia, comune, output_directory)
-    
+    pipeline_workers = args.pipeline_workers if args.pipeline_workers is not None else config.get('pipeline_workers', 0)
+    run_stats = {}
+    total_records, data = extract_complete_data(regione, provincia, comune, output_directory,
+                                                watchdog=watchdog, resume=args.resume,
+                                                pipeline_workers=pipeline_workers,
+                                                compact_records=bool(config.get('compact_records', False)),
+                                                aggregator=aggregator, run_stats=run_stats)
+
     print(f"\n🎯 EXTRACTION SUMMARY:")
     print(f"   📋 Region: {regione}")
-    print(f"   🏛️ Province: {provincia}")  
+    print(f"   🏛️ Province: {provincia}")
     print(f"   🏘️ Commune: {comune}")
     print(f"   ✅ Total records extracted: {total_records}")
+    if run_stats.get('failed_records'):
+        print(f"   ❌ Records not saved: {run_stats['failed_records']}")
     print(f"   📁 Data saved in: {output_directory}")
-    
+
+    if aggregator.total_plants:
+        for path in aggregator.write_report(output_directory, report_config.get('formats', DEFAULT_REPORT_FORMATS)):
+            print(f"   📊 Report: {path}")
+
     if total_records > 0:
         print(f"\n✅ Extraction completed successfully!")
+        return 0
     else:
-        print(f"\n⚠️ No records were extracted. Check the filters and try again.")
\ No newline at end of file
+        print(f"\n⚠️ No records were extracted. Check the filters and try again.")
+        return 1
+
+def command_validate_config(args) -> int:
+    try:
+        config = load_config(args.config)
+    except (FileNotFoundError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+
+    errors = validate_config(config)
+    if errors:
+        print("❌ Invalid configuration:")
+        for error in errors:
+            print(f"   - {error}")
+        return 1
+
+    print("✅ Configuration is valid")
+    return 0
+
+def command_export(args) -> int:
+    import pandas as pd
+
+    records = list(iter_saved_records(args.output))
+    if not records:
+        print(f"⚠️ No records found in {args.output}")
+        return 1
+
+    df = pd.json_normalize(records, sep='.')
+    destination = args.destination or os.path.join(args.output, f"records.{args.format}")
+
+    if args.format == 'csv':
+        df.to_csv(destination, index=False, encoding='utf-8')
+    elif args.format == 'parquet':
+        df.to_parquet(destination, index=False)
+    else:
+        df.to_json(destination, orient='records', lines=True, force_ascii=False)
+
+    print(f"💾 Exported {len(df)} records to {destination}")
+    return 0
+
+def command_stats(args) -> int:
+    total = 0
+    fields = 0
+    with_geometry = 0
+    by_commune = {}
+
+    for record in iter_saved_records(args.output):
+        total += 1
+        popup_data = record.get('popup_data') or {}
+        fields += len(popup_data.get('table_data') or {})
+        if popup_data.get('geometry_point'):
+            with_geometry += 1
+        commune = (record.get('filters_applied') or {}).get('commune', '')
+        by_commune[commune] = by_commune.get(commune, 0) + 1
+
+    print(f"📊 RECORD STATISTICS ({args.output}):")
+    print(f"   ✅ Total records: {total}")
+    print(f"   📍 With geometry: {with_geometry}")
+    if total:
+        print(f"   📋 Average fields per record: {fields / total:.1f}")
+    for commune, count in sorted(by_commune.items(), key=lambda item: -item[1]):
+        print(f"   🏘️ {commune or '(unknown)'}: {count}")
+    return 0
+
+def command_report(args) -> int:
+    from aggregation import PlantAggregator, AGGREGATES_FILENAME
+
+    # Same field patterns as the report written during the crawl
+    report_config = load_config(args.config).get('report') or {}
+    capacity_fields, year_fields = report_config.get('capacity_fields'), report_config.get('year_fields')
+
+    # Aggregates of parallel runs are merged; runs without them are rebuilt from their records
+    aggregator = PlantAggregator(capacity_fields, year_fields)
+    for directory in args.directories or [args.output]:
+        aggregates_path = os.path.join(directory, AGGREGATES_FILENAME)
+        if os.path.exists(aggregates_path):
+            aggregator.merge(PlantAggregator.load(aggregates_path))
+        else:
+            partial = PlantAggregator(capacity_fields, year_fields)
+            for record in iter_saved_records(directory):
+                partial.add(record)
+            aggregator.merge(partial)
+
+    if not aggregator.total_plants:
+        print("⚠️ No records found")
+        return 1
+
+    for path in aggregator.write_report(args.output, args.formats):
+        print(f"📊 Report: {path}")
+    return 0
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--config', default=None, help="Path to the configuration file (default: config.yml)")
+    common.add_argument('--output', default=DEFAULT_OUTPUT_DIRECTORY, help="Directory with the JSON records")
+
+    parser = argparse.ArgumentParser(description="Biogas plants scraper for ATLA Impianti")
+    # Running without a subcommand keeps the original behaviour: crawl with config.yml
+    parser.set_defaults(func=command_crawl, config=None, output=DEFAULT_OUTPUT_DIRECTORY, resume=False,
+                        pipeline_workers=None, probe=False)
+
+    subparsers = parser.add_subparsers(dest='command')
+
+    crawl = subparsers.add_parser('crawl', parents=[common], help="Scrape the plants selected in the configuration")
+    crawl.add_argument('--resume', action='store_true', help="Continue from the last checkpoint")
+    crawl.add_argument('--probe', action='store_true',
+                       help="Count the rows of communes without previous metrics before planning")
+    crawl.add_argument('--pipeline-workers', type=int, default=None,
+                       help="Parse and save popups in this many threads while the next one loads (0 = sequential)")
+    crawl.set_defaults(func=command_crawl)
+
+    validate = subparsers.add_parser('validate-config', parents=[common], help="Check the configuration file")
+    validate.set_defaults(func=command_validate_config)
+
+    export = subparsers.add_parser('export', parents=[common], help="Export saved records to a single file")
+    export.add_argument('--format', choices=['csv', 'parquet', 'jsonl'], default='csv')
+    export.add_argument('--destination', default=None, help="Output file (default: <output>/records.<format>)")
+    export.set_defaults(func=command_export)
+
+    stats = subparsers.add_parser('stats', parents=[common], help="Summarize saved records")
+    stats.set_defaults(func=command_stats)
+
+    plan = subparsers.add_parser('plan', parents=[common], help="Show the crawl plan without crawling")
+    plan.add_argument('--probe', action='store_true', help="Count the rows of communes without previous metrics")
+    plan.set_defaults(func=command_plan)
+
+    report = subparsers.add_parser('report', parents=[common], help="Write the summary report, merging several runs")
+    report.add_argument('directories', nargs='*', help="Output directories to merge (default: --output)")
+    report.add_argument('--formats', nargs='+', choices=['csv', 'parquet', 'md'], default=DEFAULT_REPORT_FORMATS)
+    report.set_defaults(func=command_report)
+
+    return parser
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+# Usage example
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,373 @@
+import json
+import os
+import queue
+import re
+import threading
+from html.parser import HTMLParser
+
+
+# Runs on the browser thread: clones the popup, marks the elements that are not
+# rendered (their text is left out, like WebElement.text does, but hidden inputs
+# keep their value as find_elements still returns them) and copies live input
+# values into attributes, so the whole tab can be parsed off-thread from a
+# single outerHTML string. arguments[1] is the (strategy, value) locator of the
+# tab table used by strategy 1, resolved from the selector map by the caller;
+# the matched element is marked so the parser does not hard-code its position.
+HIDDEN_ATTRIBUTE = "data-snapshot-hidden"
+TAB_TABLE_ATTRIBUTE = "data-snapshot-tab-table"
+
+SNAPSHOT_SCRIPT = """
+var popup = arguments[0], tabTable = null;
+if (arguments[1]) {
+    try {
+        if (arguments[1][0] === 'css selector') {
+            tabTable = popup.querySelector(arguments[1][1]);
+        } else {
+            tabTable = document.evaluate(arguments[1][1], popup, null,
+                XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        }
+    } catch (e) {
+        tabTable = null;
+    }
+}
+var clone = popup.cloneNode(true);
+var originals = [popup].concat(Array.prototype.slice.call(popup.querySelectorAll('*')));
+var copies = [clone].concat(Array.prototype.slice.call(clone.querySelectorAll('*')));
+for (var i = 0; i < originals.length; i++) {
+    var el = originals[i];
+    if (el === tabTable) {
+        copies[i].setAttribute('%s', '');
+    }
+    if (el.getClientRects().length === 0) {
+        copies[i].setAttribute('%s', '');
+    }
+    if (el.tagName === 'INPUT' || el.tagName === 'TEXTAREA') {
+        copies[i].setAttribute('value', el.value || '');
+    }
+}
+return clone.outerHTML;
+""" % (TAB_TABLE_ATTRIBUTE, HIDDEN_ATTRIBUTE)
+
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+# Elements that start and end a line in the rendered text
+BLOCK_TAGS = {
+    "address", "article", "aside", "blockquote", "caption", "dd", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5",
+    "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section", "table",
+    "tbody", "tfoot", "thead", "tr", "ul",
+}
+CELL_TAGS = {"td", "th"}
+NON_TEXT_TAGS = {"script", "style", "template"}
+
+
+class Node:
+    __slots__ = ("tag", "attrs", "children", "parent")
+
+    def __init__(self, tag, attrs, parent):
+        self.tag = tag
+        self.attrs = attrs
+        self.children = []
+        self.parent = parent
+
+    def iter(self, *tags):
+        """
+        Yield every descendant element, optionally only those with the given tags
+        """
+        for child in self.children:
+            if isinstance(child, Node):
+                if not tags or child.tag in tags:
+                    yield child
+                yield from child.iter(*tags)
+
+    @property
+    def hidden(self):
+        return HIDDEN_ATTRIBUTE in self.attrs
+
+    def text(self):
+        """
+        Rendered text, the snapshot equivalent of WebElement.text: hidden elements
+        are skipped, block elements and <br> break lines, table cells are separated
+        by a space and whitespace is collapsed within each line
+        """
+        if self.hidden:
+            return ""
+        lines = [[]]
+        self._collect_text(lines)
+        lines = (" ".join("".join(parts).split()) for parts in lines)
+        return "\n".join(line for line in lines if line)
+
+    def _collect_text(self, lines):
+        for child in self.children:
+            if not isinstance(child, Node):
+                lines[-1].append(child)
+            elif child.hidden or child.tag in NON_TEXT_TAGS:
+                continue
+            elif child.tag == "br":
+                lines.append([])
+            elif child.tag in BLOCK_TAGS:
+                lines.append([])
+                child._collect_text(lines)
+                lines.append([])
+            elif child.tag in CELL_TAGS:
+                lines[-1].append(" ")
+                child._collect_text(lines)
+                lines[-1].append(" ")
+            else:
+                child._collect_text(lines)
+
+    def find_by_id(self, element_id):
+        for node in self.iter():
+            if node.attrs.get("id") == element_id:
+                return node
+        return None
+
+
+class _TreeBuilder(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = Node("#document", {}, None)
+        self.current = self.root
+
+    def handle_starttag(self, tag, attrs):
+        node = Node(tag, {k: (v or "") for k, v in attrs}, self.current)
+        self.current.children.append(node)
+        if tag not in VOID_TAGS:
+            self.current = node
+
+    def handle_startendtag(self, tag, attrs):
+        self.current.children.append(Node(tag, {k: (v or "") for k, v in attrs}, self.current))
+
+    def handle_endtag(self, tag):
+        node = self.current
+        while node is not self.root and node.tag != tag:
+            node = node.parent
+        if node is not self.root:
+            self.current = node.parent
+
+    def handle_data(self, data):
+        self.current.children.append(data)
+
+
+def parse_html(html):
+    builder = _TreeBuilder()
+    builder.feed(html or "")
+    builder.close()
+    return builder.root
+
+
+def _table_pairs(table, min_key_length=1):
+    # Same as find_elements("tr") then find_elements("td"): descendants, not only children
+    pairs = {}
+    for row in table.iter("tr"):
+        cells = list(row.iter("td"))
+        if len(cells) >= 2:
+            key = cells[0].text()
+            value = cells[1].text()
+            if key and value and len(key) >= min_key_length:
+                pairs[key] = value
+    return pairs
+
+
+def extract_tab_snapshot(html):
+    """
+    Extract key/value data from the snapshot of one popup tab, using the same
+    four strategies as extract_tab_data but without any WebDriver round trip.
+
+    Element text follows the WebElement.text rules (see Node.text); CSS effects
+    such as text-transform or ::before content are not reproduced.
+
+    Args:
+        html (str): Popup outerHTML captured with SNAPSHOT_SCRIPT, with the tab
+            table of strategy 1 marked with TAB_TABLE_ATTRIBUTE
+
+    Returns:
+        dict: Extracted data from the tab
+    """
+    root = parse_html(html)
+    tab_data = {}
+
+    # Strategy 1: Tab table located by the popup_tab_table selector (marked by SNAPSHOT_SCRIPT)
+    tab_table = next((node for node in root.iter() if TAB_TABLE_ATTRIBUTE in node.attrs), None)
+    if tab_table is not None:
+        tab_data.update(_table_pairs(tab_table))
+
+    # Strategy 2: All tables within the popup
+    for table_index, table in enumerate(root.iter("table")):
+        for key, value in _table_pairs(table, min_key_length=2).items():
+            table_key = key if table_index == 0 else f"table{table_index}_{key}"
+            tab_data[table_key] = value
+
+    # Strategy 3: Input fields and their labels (hidden ones included, like find_elements)
+    labels = {}
+    for node in root.iter("label"):
+        if node.attrs.get("for"):
+            labels.setdefault(node.attrs["for"], node.text())
+    input_data = {}
+    for input_elem in root.iter("input", "textarea"):
+        if input_elem.tag == "input" and input_elem.attrs.get("type", "text") != "text":
+            continue
+        value = input_elem.attrs.get("value", "")
+        if not value.strip():
+            continue
+
+        input_id = input_elem.attrs.get("id", "")
+        label_text = labels.get(input_id, "") if input_id else ""
+
+        if not label_text and input_elem.parent is not None:
+            parent_text = input_elem.parent.text()
+            if parent_text and len(parent_text) < 100:
+                label_text = parent_text.replace(value, "").strip()
+
+        if not label_text:
+            label_text = input_id or input_elem.attrs.get("placeholder") or f"input_field_{len(input_data)}"
+
+        input_data[label_text] = value.strip()
+    tab_data.update(input_data)
+
+    # Strategy 4: Div elements with "Label: Value" patterns
+    for div in root.iter("div"):
+        div_text = div.text()
+        if ":" in div_text and len(div_text) < 200:
+            key, value = (part.strip() for part in div_text.split(":", 1))
+            if key and value and len(key) > 1:
+                tab_data[key] = value
+
+    return tab_data
+
+
+def parse_point(value):
+    """
+    Parse a WKT POINT value
+
+    Returns:
+        tuple: (geometry_point, coordinate_x, coordinate_y), empty/None when not found
+    """
+    point_match = re.search(r'POINT\s*\([^)]+\)', value or "")
+    if not point_match:
+        return "", None, None
+
+    coords_match = re.search(r'POINT\s*\(\s*([0-9.-]+)\s+([0-9.-]+)\s*\)', value)
+    if not coords_match:
+        return point_match.group(), None, None
+
+    x, y = coords_match.groups()
+    return point_match.group(), float(x), float(y)
+
+
+def parse_popup_snapshot(snapshot):
+    """
+    Build the popup_data dict of a record from a raw popup snapshot
+
+    Args:
+        snapshot (dict): {"title": str, "point_value": str, "tabs": {label: html}}
+
+    Returns:
+        dict: Same structure returned by extract_popup_data
+    """
+    geometry_point, coordinate_x, coordinate_y = parse_point(snapshot.get("point_value"))
+
+    table_data = {}
+    for label, html in snapshot.get("tabs", {}).items():
+        for key, value in extract_tab_snapshot(html).items():
+            table_data[f"{label}_{key}"] = value
+
+    return {
+        "title": snapshot.get("title", ""),
+        "table_data": table_data,
+        "geometry_point": geometry_point,
+        "coordinate_x": coordinate_x,
+        "coordinate_y": coordinate_y
+    }
+
+
+class RecordPipeline:
+    """
+    Producer/consumer pipeline: the browser thread submits raw popup snapshots,
+    worker threads parse them and write the JSON records while the next popup loads
+    """
+
+    def __init__(self, output_directory, workers=2, max_pending=8, on_record=None):
+        """
+        Args:
+            output_directory (str): Directory where to save JSON files
+            workers (int): Number of parsing/writing threads
+            max_pending (int): Snapshots waiting in the queue before submit() blocks
+            on_record (callable): Called with each complete record once its JSON
+                file has been written; records that fail are never passed to it
+        """
+        self.output_directory = output_directory
+        self.on_record = on_record
+        self.queue = queue.Queue(maxsize=max(1, max_pending))
+        self.lock = threading.Lock()
+        self.saved = 0
+        self.failed = []
+        self.threads = []
+        self.closed = False
+
+        for index in range(max(1, workers)):
+            thread = threading.Thread(target=self._worker, name=f"record-writer-{index}", daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def submit(self, click_number, row_data, snapshot, filters_applied):
+        """
+        Queue a snapshot for parsing; blocks when max_pending snapshots are waiting
+        """
+        self.queue.put((click_number, row_data, snapshot, filters_applied))
+
+    def _worker(self):
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                self._process(*item)
+            except Exception as e:
+                with self.lock:
+                    self.failed.append(item[0])
+                print(f"⚠️ Error writing record #{item[0]}: {e}")
+            finally:
+                self.queue.task_done()
+
+    def _process(self, click_number, row_data, snapshot, filters_applied):
+        complete_record = {
+            "click_number": click_number,
+            "row_data": row_data,
+            "popup_data": parse_popup_snapshot(snapshot),
+            "filters_applied": filters_applied
+        }
+
+        filename = f"record_{click_number:04d}.json"
+        filepath = os.path.join(self.output_directory, filename)
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(complete_record, f, ensure_ascii=False, indent=2)
+
+        with self.lock:
+            self.saved += 1
+            if self.on_record is not None:
+                self.on_record(complete_record)
+        print(f"💾 Saved: {filename} ({len(complete_record['popup_data']['table_data'])} fields)")
+
+    @property
+    def errors(self):
+        return len(self.failed)
+
+    def flush(self):
+        """
+        Wait until every submitted snapshot has been written
+        """
+        self.queue.join()
+
+    def close(self):
+        """
+        Flush the queue and stop the worker threads
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.flush()
+        for _ in self.threads:
+            self.queue.put(None)
+        for thread in self.threads:
+            thread.join()
@@ -0,0 +1,302 @@
+import json
+import os
+import time
+
+
+DOM_NODE_COUNT_SCRIPT = """
+return {
+    nodes: document.getElementsByTagName('*').length,
+    js_heap: (window.performance && performance.memory) ? performance.memory.usedJSHeapSize : null
+};
+"""
+
+
+def _python_rss_mb():
+    """
+    Return the resident memory of the current Python process in MB
+
+    Uses psutil when installed and falls back to /proc/self/statm on Linux.
+
+    Returns:
+        float or None: Resident set size in MB, None if it cannot be measured
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    except Exception:
+        return None
+
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except Exception:
+        return None
+
+
+def _chrome_rss_mb(driver):
+    """
+    Return the combined resident memory of chromedriver and all Chrome processes in MB
+
+    Args:
+        driver: WebDriver instance
+
+    Returns:
+        float or None: Resident set size in MB, None if psutil is not installed
+    """
+    try:
+        import psutil
+    except ImportError:
+        return None
+
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        total = 0
+        for proc in [root] + root.children(recursive=True):
+            try:
+                total += proc.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return total / (1024 * 1024)
+    except Exception:
+        return None
+
+
+class ResourceWatchdog:
+    """
+    Samples Chrome and Python memory, DOM size and per-record latency during a crawl
+    and decides when the page or the browser has to be recycled.
+
+    Actions returned by check():
+        "flush"   - Python memory is over the limit, drop records already saved to disk
+        "page"    - reload the page and re-apply the filters
+        "browser" - quit Chrome and start a new browser session
+    """
+
+    def __init__(self, max_chrome_rss_mb=1500, max_python_rss_mb=1024, max_dom_nodes=60000,
+                 max_js_heap_mb=512, max_latency_factor=2.5, check_every=10,
+                 latency_window=20, browser_recycle_after=3):
+        """
+        Args:
+            max_chrome_rss_mb (float): Chrome memory limit before restarting the browser
+            max_python_rss_mb (float): Python memory limit before flushing in-memory records
+            max_dom_nodes (int): DOM node limit before reloading the page
+            max_js_heap_mb (float): JS heap limit before reloading the page
+            max_latency_factor (float): Reload the page when the recent average latency
+                exceeds the baseline latency by this factor
+            check_every (int): Number of records between two samples
+            latency_window (int): Number of records used for the baseline and recent averages
+            browser_recycle_after (int): Page reloads before escalating to a browser restart
+        """
+        self.max_chrome_rss_mb = max_chrome_rss_mb
+        self.max_python_rss_mb = max_python_rss_mb
+        self.max_dom_nodes = max_dom_nodes
+        self.max_js_heap_mb = max_js_heap_mb
+        self.max_latency_factor = max_latency_factor
+        self.check_every = max(1, int(check_every))
+        self.latency_window = max(1, int(latency_window))
+        self.browser_recycle_after = max(1, int(browser_recycle_after))
+
+        self.records_since_check = 0
+        self.page_recycles_since_restart = 0
+        self.baseline_latency = None
+        self.recent_latencies = []
+        self.last_sample = {}
+        self.stats = {"page_recycles": 0, "browser_restarts": 0, "flushes": 0}
+
+    @classmethod
+    def from_config(cls, config):
+        """
+        Build a watchdog from the optional 'watchdog' section of config.yml
+
+        Args:
+            config (dict): Values of the 'watchdog' section, None to use the defaults
+
+        Returns:
+            ResourceWatchdog: Configured watchdog
+        """
+        return cls(**(config or {}))
+
+    def record_latency(self, seconds):
+        """
+        Register the time spent on a single record
+        """
+        self.records_since_check += 1
+        self.recent_latencies.append(seconds)
+        if len(self.recent_latencies) > self.latency_window:
+            self.recent_latencies.pop(0)
+
+        if self.baseline_latency is None and len(self.recent_latencies) == self.latency_window:
+            ordered = sorted(self.recent_latencies)
+            self.baseline_latency = ordered[len(ordered) // 2]
+            print(f"⏱️ Baseline latency: {self.baseline_latency:.2f}s per record")
+
+    def sample(self, driver):
+        """
+        Take a snapshot of the resources currently in use
+
+        Args:
+            driver: WebDriver instance
+
+        Returns:
+            dict: chrome_rss_mb, python_rss_mb, dom_nodes, js_heap_mb and recent_latency
+        """
+        dom_nodes = None
+        js_heap_mb = None
+        try:
+            page_stats = driver.execute_script(DOM_NODE_COUNT_SCRIPT) or {}
+            dom_nodes = page_stats.get("nodes")
+            if page_stats.get("js_heap") is not None:
+                js_heap_mb = page_stats["js_heap"] / (1024 * 1024)
+        except Exception:
+            pass
+
+        recent_latency = None
+        if self.recent_latencies:
+            recent_latency = sum(self.recent_latencies) / len(self.recent_latencies)
+
+        self.last_sample = {
+            "timestamp": time.time(),
+            "chrome_rss_mb": _chrome_rss_mb(driver),
+            "python_rss_mb": _python_rss_mb(),
+            "dom_nodes": dom_nodes,
+            "js_heap_mb": js_heap_mb,
+            "recent_latency": recent_latency,
+        }
+        return self.last_sample
+
+    @property
+    def sample_due(self):
+        """
+        True when the next check() call will take a sample
+        """
+        return self.records_since_check >= self.check_every
+
+    def check(self, driver):
+        """
+        Sample resources every check_every records and decide what has to be recycled
+
+        Args:
+            driver: WebDriver instance
+
+        Returns:
+            list: Actions to perform ("flush", "page", "browser"), empty if all is fine
+        """
+        if not self.sample_due:
+            return []
+        self.records_since_check = 0
+
+        sample = self.sample(driver)
+        actions = []
+        reasons = []
+
+        if _over(sample["python_rss_mb"], self.max_python_rss_mb):
+            actions.append("flush")
+            reasons.append(f"Python RSS {sample['python_rss_mb']:.0f} MB")
+
+        if _over(sample["chrome_rss_mb"], self.max_chrome_rss_mb):
+            actions.append("browser")
+            reasons.append(f"Chrome RSS {sample['chrome_rss_mb']:.0f} MB")
+        else:
+            page_reasons = []
+            if _over(sample["dom_nodes"], self.max_dom_nodes):
+                page_reasons.append(f"{sample['dom_nodes']} DOM nodes")
+            if _over(sample["js_heap_mb"], self.max_js_heap_mb):
+                page_reasons.append(f"JS heap {sample['js_heap_mb']:.0f} MB")
+            if (self.baseline_latency and sample["recent_latency"] is not None
+                    and len(self.recent_latencies) == self.latency_window
+                    and sample["recent_latency"] > self.baseline_latency * self.max_latency_factor):
+                page_reasons.append(f"latency {sample['recent_latency']:.2f}s")
+
+            if page_reasons:
+                reasons.extend(page_reasons)
+                if self.page_recycles_since_restart + 1 >= self.browser_recycle_after:
+                    actions.append("browser")
+                else:
+                    actions.append("page")
+
+        if actions:
+            print(f"🐕 Watchdog triggered ({', '.join(reasons)}): {', '.join(actions)}")
+        return actions
+
+    def notify_recycled(self, action):
+        """
+        Update the counters after the caller has performed an action
+        """
+        if action == "flush":
+            # The caller keeps no records in memory after a flush and the RSS rarely
+            # goes down after it, so the Python limit would trigger on every sample
+            self.stats["flushes"] += 1
+            self.max_python_rss_mb = None
+            return
+
+        if action == "browser":
+            self.stats["browser_restarts"] += 1
+            self.page_recycles_since_restart = 0
+        elif action == "page":
+            self.stats["page_recycles"] += 1
+            self.page_recycles_since_restart += 1
+
+        # The latency of a fresh page should go back to the baseline
+        self.recent_latencies = []
+
+
+def _over(value, limit):
+    return value is not None and limit is not None and value > limit
+
+
+def checkpoint_path(output_directory):
+    return os.path.join(output_directory, "_checkpoint.json")
+
+
+def save_checkpoint(output_directory, total_clicks, scroll_top, processed_rows, aggregates=None, records=None):
+    """
+    Save the crawl progress so it can be resumed after a recycle or a crash.
+    The crawl saves it on every watchdog sample, so a crash loses at most the
+    last check_every records, which are crawled again on resume.
+
+    Args:
+        output_directory (str): Directory where the JSON records are saved
+        total_clicks (int): Number of popups opened so far, used to number the record files
+        scroll_top (int): Scroll position of the grid
+        processed_rows (set): Signatures of the rows already saved
+        aggregates (dict): PlantAggregator state matching processed_rows, kept in
+            the same file so a resumed run never counts a record twice
+        records (int): Number of records saved so far, total_clicks if None
+    """
+    state = {
+        "total_clicks": total_clicks,
+        "scroll_top": scroll_top,
+        "processed_rows": sorted(processed_rows),
+        "records": total_clicks if records is None else records,
+        "aggregates": aggregates,
+        "saved_at": time.time(),
+    }
+    path = checkpoint_path(output_directory)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+    print(f"💾 Checkpoint saved: {state['records']} records, scroll position {scroll_top}")
+
+
+def load_checkpoint(output_directory):
+    """
+    Load the crawl progress saved by save_checkpoint
+
+    Returns:
+        dict or None: Checkpoint state, None if there is no checkpoint
+    """
+    path = checkpoint_path(output_directory)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        state["processed_rows"] = set(state.get("processed_rows", []))
+        return state
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not read checkpoint {path}: {e}")
+        return None
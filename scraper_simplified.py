@@ -5,12 +5,23 @@ from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, NoSuchWindowException, WebDriverException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 import time
 import json
 import os
 import re
 
+from resource_watchdog import ResourceWatchdog, save_checkpoint, load_checkpoint
+from site_selectors import SelectorMap, SelectorDriftError
+from popup_pipeline import RecordPipeline, SNAPSHOT_SCRIPT
+from compact_records import RecordStore
+from aggregation import PlantAggregator, AGGREGATES_FILENAME
+
+
+SELECTORS = SelectorMap()
+
+POPUP_TAB_LABELS = ["Dati Tecnici", "Ubicazione", "Altri Dati", "Convenzioni"]
+
 
 def check_site_connectivity(url, timeout=30):
     """
@@ -46,7 +57,7 @@ def extract_row_data(row):
     """
     row_data = {}
     try:
-        cells = row.find_elements(By.CSS_SELECTOR, ".dojoxGridCell")
+        cells = row.find_elements(*SELECTORS.locator("grid_cell"))
         
         for i, cell in enumerate(cells):
             try:
@@ -76,6 +87,97 @@ def extract_row_data(row):
         return {}
 
 
+def set_selector_map(selector_map):
+    """
+    Replace the selector map used by the scraper (e.g., one loaded with SelectorMap.from_file)
+    """
+    global SELECTORS
+    SELECTORS = selector_map
+
+
+def wait_for(driver, name, condition="clickable", timeout=60, **params):
+    """
+    Wait for an element of the selector map, reusing the element resolved earlier
+    in the same page session when it is still attached
+    
+    Args:
+        driver: WebDriver instance
+        name (str): Selector name in the selector map
+        condition (str): "clickable", "visible" or "present"
+        timeout (int): Maximum wait time in seconds
+        **params: Values for templated selectors (e.g., i=3)
+    
+    Returns:
+        WebElement: Element matching the condition
+    """
+    cached = SELECTORS.cached_element(driver, name, **params)
+    if cached is not None:
+        if condition == "present":
+            return cached
+        cached_condition = EC.element_to_be_clickable(cached) if condition == "clickable" else EC.visibility_of(cached)
+        return WebDriverWait(driver, timeout).until(cached_condition)
+    
+    locator = SELECTORS.locator(name, **params)
+    if condition == "clickable":
+        element = WebDriverWait(driver, timeout).until(EC.element_to_be_clickable(locator))
+    elif condition == "visible":
+        element = WebDriverWait(driver, timeout).until(EC.visibility_of_element_located(locator))
+    else:
+        element = WebDriverWait(driver, timeout).until(EC.presence_of_element_located(locator))
+    
+    SELECTORS.remember(driver, name, element, **params)
+    return element
+
+
+# Waits for the first selector of a phase before its health check, so content
+# that is still loading is not reported as selector drift
+READY_TIMEOUT = 30
+
+# Choice windows are already loaded when their first element shows up, a missing
+# element there means selector drift rather than a slow page
+CHOICE_TIMEOUT = 15
+
+
+def check_when_ready(driver, phase, first, selectors=None, timeout=READY_TIMEOUT):
+    """
+    Wait for the first selector of a phase to be in the DOM, then validate the
+    phase with a single health check
+    
+    Args:
+        driver: WebDriver instance
+        phase (str): Phase to check
+        first (str): Selector name signalling that the phase content has loaded
+        selectors (list): Passed to SelectorMap.health_check, None for the whole phase
+        timeout (int): Maximum wait for the first selector
+    
+    Raises:
+        SelectorDriftError: If a required selector is missing
+    """
+    try:
+        wait_for(driver, first, condition="present", timeout=timeout)
+    except TimeoutException:
+        pass  # Reported by the health check below
+    SELECTORS.health_check(driver, phase, selectors)
+
+
+def open_choice_window(driver, widget, selectors):
+    """
+    Click a filter widget and check the selectors of the choice window it opens
+    with a single health check, so a renumbered window fails fast
+    
+    Args:
+        driver: WebDriver instance
+        widget (str): Selector name of the filter widget opening the window
+        selectors (list): Window selectors for SelectorMap.health_check; the first
+            one must be a plain name, it is waited for before the check
+    
+    Raises:
+        SelectorDriftError: If a selector of the window is missing
+    """
+    wait_for(driver, widget).click()
+    check_when_ready(driver, "choice", selectors[0], selectors, timeout=CHOICE_TIMEOUT)
+
+
 def apply_filters(driver, region, province, commune):
     """
     Apply region, province and commune filters
@@ -93,107 +195,66 @@ def apply_filters(driver, region, province, commune):
         print(f"🎯 Applying filters: Region={region}, Province={province}, Commune={commune}")
         
         # Click filter button
-        filter_button = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, '//*[@id="gwClassListDataGrid_impianti_internet_Toolbar"]/span[2]'))
-        )
+        filter_button = wait_for(driver, "filter_button")
         filter_button.click()
         print("✅ Filter button clicked successfully")
         
         # Wait for filter popup
-        WebDriverWait(driver, 60).until(
-            EC.visibility_of_element_located((By.CSS_SELECTOR, ".dojoxFloatingPane"))
-        )
+        wait_for(driver, "floating_pane", condition="visible")
         
-        # Initial popup setup
-        popup_element = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, '//*[@id="widget_sf_value_137603"]'))
-        )
-        popup_element.click()
-        
-        choice_element = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, '//*[@id="windowChoice_137603_rowSelector_0"]'))
-        )
-        choice_element.click()
+        # Fail fast if the site renumbered the filter widgets (the pane content loads after the pane)
+        check_when_ready(driver, "filter", "initial_widget")
         
-        toolbar_element = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, '//*[@id="dijit_Toolbar_3"]/span'))
-        )
-        toolbar_element.click()
+        # Initial popup setup
+        open_choice_window(driver, "initial_widget", ["initial_choice", ("choice_toolbar", {"n": 3})])
+        wait_for(driver, "initial_choice", timeout=CHOICE_TIMEOUT).click()
+        wait_for(driver, "choice_toolbar", timeout=CHOICE_TIMEOUT, n=3).click()
 
         # REGION FILTER
         print(f"🌍 Applying region filter: {region}")
-        region_widget = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, '//*[@id="widget_sf_value_137615"]'))
-        )
-        region_widget.click()
+        open_choice_window(driver, "region_widget", ["region_field", ("choice_toolbar", {"n": 4})])
         
-        region_field = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, '//*[@id="filterColumnTop_ai_regione"]'))
-        )
+        region_field = wait_for(driver, "region_field", timeout=CHOICE_TIMEOUT)
         region_field.clear()
         region_field.send_keys(region)
         time.sleep(3)
         
         # Select first region option
-        region_checkbox = WebDriverWait(driver, 30).until(
-            EC.element_to_be_clickable((By.XPATH, '//*[@id="windowChoice_137615_rowSelector_0"]'))
-        )
-        region_checkbox.click()
+        wait_for(driver, "region_choice", timeout=CHOICE_TIMEOUT).click()
         print(f"✅ Region '{region}' selected")
         
         # Continue to province
-        toolbar_4 = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, '//*[@id="dijit_Toolbar_4"]/span'))
-        )
-        toolbar_4.click()
+        wait_for(driver, "choice_toolbar", timeout=CHOICE_TIMEOUT, n=4).click()
 
         # PROVINCE FILTER
         print(f"🏛️ Applying province filter: {province}")
-        province_widget = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, '//*[@id="widget_sf_value_137614"]'))
-        )
-        province_widget.click()
+        open_choice_window(driver, "province_widget", ["province_field", ("choice_toolbar", {"n": 5})])
         
-        province_field = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, '//*[@id="filterColumnTop_nome_pro"]'))
-        )
+        province_field = wait_for(driver, "province_field", timeout=CHOICE_TIMEOUT)
         province_field.clear()
         province_field.send_keys(province)
         time.sleep(3)
         
         # Select first province option
-        province_checkbox = WebDriverWait(driver, 30).until(
-            EC.element_to_be_clickable((By.XPATH, '//*[@id="windowChoice_137614_rowSelector_0"]'))
-        )
-        province_checkbox.click()
+        wait_for(driver, "province_choice", timeout=CHOICE_TIMEOUT).click()
         print(f"✅ Province '{province}' selected")
         
         # Continue to commune
-        toolbar_5 = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, '//*[@id="dijit_Toolbar_5"]/span'))
-        )
-        toolbar_5.click()
+        wait_for(driver, "choice_toolbar", timeout=CHOICE_TIMEOUT, n=5).click()
 
         # COMMUNE FILTER
         print(f"🏘️ Applying commune filter: {commune}")
-        commune_widget = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, '//*[@id="sf_value_137616"]'))
-        )
-        commune_widget.click()
+        open_choice_window(driver, "commune_widget", ["commune_field", ("choice_toolbar", {"n": 6})])
         
-        commune_field = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, '//*[@id="filterColumnTop_ai_comune"]'))
-        )
+        commune_field = wait_for(driver, "commune_field", timeout=CHOICE_TIMEOUT)
         commune_field.clear()
         commune_field.send_keys(commune)
         time.sleep(3)
         
         # Select all available commune options
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.CSS_SELECTOR, '[id*="windowChoice_137616"] tr'))
-        )
+        wait_for(driver, "commune_choice_table", condition="present", timeout=CHOICE_TIMEOUT)
         
-        commune_rows = driver.find_elements(By.CSS_SELECTOR, '[id*="windowChoice_137616"] tr[class*="dojoxGridRow"]')
+        commune_rows = driver.find_elements(*SELECTORS.locator("commune_choice_rows"))
         
         selected_count = 0
         for i, row in enumerate(commune_rows):
@@ -201,7 +262,7 @@ def apply_filters(driver, region, province, commune):
                 break
             try:
                 checkbox = WebDriverWait(driver, 2).until(
-                    EC.element_to_be_clickable((By.XPATH, f'//*[@id="windowChoice_137616_rowSelector_{i}"]'))
+                    EC.element_to_be_clickable(SELECTORS.locator("commune_choice", i=i))
                 )
                 checkbox.click()
                 selected_count += 1
@@ -211,27 +272,20 @@ def apply_filters(driver, region, province, commune):
         print(f"✅ Selected {selected_count} commune options")
         
         # Continue to apply filters
-        toolbar_6 = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, '//*[@id="dijit_Toolbar_6"]/span'))
-        )
-        toolbar_6.click()
+        wait_for(driver, "choice_toolbar", timeout=CHOICE_TIMEOUT, n=6).click()
         
         # Apply all filters
-        apply_button = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, '//*[@id="dijit_Toolbar_2"]/span[3]'))
-        )
-        apply_button.click()
+        wait_for(driver, "filter_apply_button").click()
         print("✅ Filters applied successfully")
         
         # Close filter popup
-        close_button = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, '//*[@id="gwFP_filter_137591"]/div[1]/span[1]'))
-        )
-        close_button.click()
+        wait_for(driver, "filter_close_button").click()
         print("✅ Filter popup closed")
         
         return True
         
+    except SelectorDriftError:
+        raise
     except Exception as e:
         print(f"❌ Error applying filters: {e}")
         return False
@@ -252,7 +306,7 @@ def extract_popup_data(driver, popup):
         
         # Extract title
         try:
-            title_element = popup.find_element(By.CSS_SELECTOR, ".dijitTitleNode")
+            title_element = popup.find_element(*SELECTORS.locator("popup_title"))
             popup_info["title"] = title_element.text.strip()
         except:
             pass
@@ -302,16 +356,14 @@ def extract_popup_data(driver, popup):
         
         # Extract table data from all tabs - IMPROVED METHOD
         table_data = {}
-        tab_labels = ["Dati Tecnici", "Ubicazione", "Altri Dati", "Convenzioni"]
-        
         print("📋 Extracting data from all tabs...")
         
-        for tab_index, label in enumerate(tab_labels):
+        for tab_index, label in enumerate(POPUP_TAB_LABELS):
             try:
                 print(f"   🔍 Processing tab: {label}")
                 
                 # Click on tab
-                tab_button = popup.find_element(By.XPATH, f"//span[@class='tabLabel' and text()='{label}']")
+                tab_button = popup.find_element(*SELECTORS.locator("popup_tab", label=label))
                 driver.execute_script("arguments[0].click();", tab_button)
                 time.sleep(2)  # Wait for tab content to load
                 
@@ -334,26 +386,7 @@ def extract_popup_data(driver, popup):
         print(f"✅ Total table data extracted: {len(table_data)} fields")
         
         # Close popup - IMPROVED METHOD
-        print("🔒 Closing popup...")
-        try:
-            close_button = popup.find_element(By.CSS_SELECTOR, ".dojoxFloatingCloseIcon")
-            driver.execute_script("arguments[0].click();", close_button)
-            
-            # Wait for popup to close
-            WebDriverWait(driver, 30).until(EC.invisibility_of_element(popup))
-            print("✅ Popup closed successfully")
-            
-        except Exception as e:
-            print(f"⚠️ Error closing popup with close button: {e}")
-            
-            # Alternative method: Press Escape key
-            try:
-                popup.send_keys(Keys.ESCAPE)
-                WebDriverWait(driver, 10).until(EC.invisibility_of_element(popup))
-                print("✅ Popup closed with Escape key")
-            except Exception as e2:
-                print(f"⚠️ Error closing popup with Escape: {e2}")
-                print("⚠️ Continuing despite popup close error...")
+        close_popup(driver, popup)
         
         # Final summary
         print(f"📊 POPUP DATA EXTRACTION SUMMARY:")
@@ -368,6 +401,87 @@ def extract_popup_data(driver, popup):
         return None
 
 
+def close_popup(driver, popup):
+    """
+    Close a plant popup with its close icon, falling back to the Escape key
+    """
+    print("🔒 Closing popup...")
+    try:
+        close_button = popup.find_element(*SELECTORS.locator("popup_close_button"))
+        driver.execute_script("arguments[0].click();", close_button)
+        
+        # Wait for popup to close
+        WebDriverWait(driver, 30).until(EC.invisibility_of_element(popup))
+        print("✅ Popup closed successfully")
+        
+    except Exception as e:
+        print(f"⚠️ Error closing popup with close button: {e}")
+        
+        # Alternative method: Press Escape key
+        try:
+            popup.send_keys(Keys.ESCAPE)
+            WebDriverWait(driver, 10).until(EC.invisibility_of_element(popup))
+            print("✅ Popup closed with Escape key")
+        except Exception as e2:
+            print(f"⚠️ Error closing popup with Escape: {e2}")
+            print("⚠️ Continuing despite popup close error...")
+
+
+POINT_VALUE_SCRIPT = """
+var inputs = arguments[0].querySelectorAll('input');
+for (var i = 0; i < inputs.length; i++) {
+    var value = inputs[i].value || '';
+    if (value.indexOf('POINT(') !== -1 && value.indexOf(')') !== -1) {
+        return value;
+    }
+}
+return null;
+"""
+
+
+def capture_popup_snapshot(driver, popup):
+    """
+    Capture the raw content of a popup on the browser thread, leaving the parsing
+    to parse_popup_snapshot so it can run while the next popup loads
+    
+    Args:
+        driver: WebDriver instance
+        popup: Popup element
+    
+    Returns:
+        dict: {"title": str, "point_value": str, "tabs": {label: html}}
+    """
+    snapshot = {"title": "", "point_value": "", "tabs": {}}
+    # Same locator as strategy 1 of extract_tab_data, so both modes follow selectors_file
+    tab_table_locator = list(SELECTORS.locator("popup_tab_table"))
+    
+    try:
+        snapshot["title"] = popup.find_element(*SELECTORS.locator("popup_title")).text.strip()
+    except:
+        pass
+    
+    try:
+        snapshot["point_value"] = WebDriverWait(driver, 60).until(
+            lambda d: d.execute_script(POINT_VALUE_SCRIPT, popup)
+        )
+    except TimeoutException:
+        print("   ⚠️ POINT geometry not found within timeout")
+    except Exception as e:
+        print(f"   ⚠️ Error reading POINT: {e}")
+    
+    for label in POPUP_TAB_LABELS:
+        try:
+            tab_button = popup.find_element(*SELECTORS.locator("popup_tab", label=label))
+            driver.execute_script("arguments[0].click();", tab_button)
+            time.sleep(2)  # Wait for tab content to load
+            snapshot["tabs"][label] = driver.execute_script(SNAPSHOT_SCRIPT, popup, tab_table_locator)
+        except Exception as e:
+            print(f"   ⚠️ Error capturing tab {label}: {e}")
+    
+    close_popup(driver, popup)
+    return snapshot
+
+
 def extract_tab_data(driver, popup, tab_name):
     """
     Extract data from a specific tab within the popup using multiple strategies
@@ -385,10 +499,9 @@ def extract_tab_data(driver, popup, tab_name):
     try:
         print(f"      🔍 Extracting data from tab: {tab_name}")
         
-        # Strategy 1: Try the original fixed XPath
+        # Strategy 1: Try the original fixed locator
         try:
-            table_xpath = '//*[@id="dijit_layout_TabContainer_1"]/div[3]'
-            table_element = popup.find_element(By.XPATH, table_xpath)
+            table_element = popup.find_element(*SELECTORS.locator("popup_tab_table"))
             
             rows = table_element.find_elements(By.CSS_SELECTOR, "tr")
             strategy1_data = {}
@@ -406,7 +519,7 @@ def extract_tab_data(driver, popup, tab_name):
             
             if strategy1_data:
                 tab_data.update(strategy1_data)
-                print(f"      ✅ Strategy 1 (fixed XPath) extracted {len(strategy1_data)} fields")
+                print(f"      ✅ Strategy 1 (fixed locator) extracted {len(strategy1_data)} fields")
             
         except Exception as e:
             print(f"      ⚠️ Strategy 1 failed: {e}")
@@ -521,21 +634,19 @@ def extract_tab_data(driver, popup, tab_name):
         return {}
 
 
-def extract_complete_data(region, province, commune, output_directory):
+ATLA_URL = "https://atla.gse.it/atlaimpianti/project/Atlaimpianti_Internet.html"
+
+# Consecutive browser crashes without a saved record before the crawl gives up
+MAX_BROWSER_FAILURES = 3
+
+
+def create_driver():
     """
-    Main function that extracts all data from atlaimpianti with specific filters
-    
-    Args:
-        region (str): Region name (e.g., "ABRUZZO")
-        province (str): Province name (e.g., "Chieti") 
-        commune (str): Commune name (e.g., "LANCIANO")
-        output_directory (str): Directory where to save JSON files
+    Start a new Chrome session with the options used by the scraper
     
     Returns:
-        tuple: (total_clicks, extracted_data) with number of processed records and data
+        WebDriver: Chrome driver instance
     """
-    
-    # Configure Chrome with optimized options
     options = Options()
     options.add_argument("--start-maximized")
     options.add_argument("--no-sandbox")
@@ -550,102 +661,347 @@ def extract_complete_data(region, province, commune, output_directory):
     driver.implicitly_wait(5)
 
     print("✅ Google Chrome started successfully")
+    return driver
+
+
+def browser_is_alive(driver):
+    """
+    Check whether the browser session still answers commands, to tell a crashed
+    tab or driver apart from an ordinary Selenium error on a single element
+    """
+    try:
+        driver.execute_script("return 1;")
+        return True
+    except Exception:
+        return False
+
+
+def open_filtered_grid(driver, region, province, commune, url=ATLA_URL):
+    """
+    Load the site, dismiss the initial dialog, open the plants grid and apply the filters
+    
+    Args:
+        driver: WebDriver instance
+        region (str): Region name (e.g., "ABRUZZO")
+        province (str): Province name (e.g., "Chieti") 
+        commune (str): Commune name (e.g., "LANCIANO")
+        url (str): Website URL
+    
+    Returns:
+        WebElement or None: Grid scroll box, None if the filters could not be applied
+    """
+    # Load page
+    print("🌐 Loading page...")
+    driver.get(url)
+    SELECTORS.reset_session(driver)
+    
+    # Wait for page to load
+    WebDriverWait(driver, 30).until(
+        EC.presence_of_element_located((By.TAG_NAME, "body"))
+    )
+    
+    WebDriverWait(driver, 45).until(
+        EC.any_of(
+            EC.presence_of_element_located((By.CLASS_NAME, "dijitDialog")),
+            EC.presence_of_element_located((By.XPATH, "//div[contains(@class,'dijitDialog') or @role='dialog']")),
+            EC.presence_of_element_located((By.TAG_NAME, "iframe"))
+        )
+    )
+    
+    print("✅ Page loaded successfully")
+    
+    # Handle initial dialog
+    try:
+        dialog = wait_for(driver, "initial_dialog", condition="visible", timeout=30)
+        wait_for(driver, "dialog_ok_button", timeout=15).click()
+        
+        WebDriverWait(driver, 30).until(EC.invisibility_of_element(dialog))
+        print("✅ Initial dialog handled successfully")
+    except:
+        print("⚠️ No initial dialog found, continuing...")
+    
+    # Validate the page selectors in one round trip before any long wait
+    check_when_ready(driver, "page", "grid_panel")
+    
+    # Initial navigation
+    target = wait_for(driver, "grid_panel")
+    driver.execute_script("arguments[0].scrollIntoView(true); arguments[0].click();", target)
+    print("✅ Initial navigation completed")
+    
+    # Apply filters
+    if not apply_filters(driver, region, province, commune):
+        return None
+    
+    # Wait for table to update after applying filters
+    time.sleep(10)
+    scroll_element = wait_for(driver, "grid_scrollbox", condition="present", timeout=20)
+    SELECTORS.health_check(driver, "grid")
+    return scroll_element
+
+
+GRID_ROW_COUNT_SCRIPT = """
+var node = arguments[0];
+if (!node || !window.dijit || !dijit.byNode) {
+    return null;
+}
+var grid = dijit.byNode(node);
+return grid && typeof grid.rowCount === 'number' ? grid.rowCount : null;
+"""
+
+
+def count_grid_rows(driver):
+    """
+    Read the total number of rows of the filtered grid from the Dojo widget,
+    which knows it before any row is scrolled into view
+    
+    Returns:
+        int or None: Number of rows, None if the widget could not be read
+    """
+    try:
+        grid_node = driver.find_element(*SELECTORS.locator("grid_widget"))
+        return driver.execute_script(GRID_ROW_COUNT_SCRIPT, grid_node)
+    except Exception:
+        return None
+
+
+def probe_row_count(region, province, commune):
+    """
+    Open a browser only to apply the filters and count the grid rows, used by
+    the crawl planner to estimate the cost of a commune before crawling it
+    
+    Returns:
+        int or None: Number of rows, None if the probe failed
+    """
+    driver = create_driver()
+    try:
+        if open_filtered_grid(driver, region, province, commune) is None:
+            return None
+        rows = count_grid_rows(driver)
+        print(f"🔎 {region} > {province} > {commune}: {rows} rows")
+        return rows
+    except Exception as e:
+        print(f"⚠️ Row count probe failed for {commune}: {e}")
+        return None
+    finally:
+        try:
+            driver.quit()
+        except:
+            pass
+
+
+GRID_SCROLL_TO_ROW_SCRIPT = """
+var node = arguments[0], index = arguments[1];
+if (!node || !window.dijit || !dijit.byNode) {
+    return false;
+}
+var grid = dijit.byNode(node);
+if (!grid || typeof grid.scrollToRow !== 'function') {
+    return false;
+}
+grid.scrollToRow(index);
+var row = node.querySelector('.dojoxGridRow');
+return !!row && typeof row.gridRowIndex === 'number';
+"""
+
+
+def scroll_to_row(driver, scroll_element, index):
+    """
+    Jump the grid to a row index, so a row-range sub-job does not scroll through
+    the rows before its range. Only done when the rendered rows expose
+    gridRowIndex; otherwise the grid stays at the top, because the fallback
+    row numbering needs every row from the first one.
+    
+    Returns:
+        bool: True if the grid was moved to the row
+    """
+    try:
+        grid_node = driver.find_element(*SELECTORS.locator("grid_widget"))
+        if driver.execute_script(GRID_SCROLL_TO_ROW_SCRIPT, grid_node, index):
+            time.sleep(2)
+            print(f"⏩ Jumped to grid row {index}")
+            return True
+    except Exception as e:
+        print(f"⚠️ Could not jump to grid row {index}: {e}")
+    try:
+        driver.execute_script("arguments[0].scrollTop = 0;", scroll_element)
+    except Exception:
+        pass
+    return False
+
+
+def row_signature(row_data):
+    """
+    Build a stable identifier for a grid row, used to skip rows already saved
+    after a page reload or a browser restart
+    """
+    return json.dumps(row_data, sort_keys=True, ensure_ascii=False)
+
+
+def extract_complete_data(region, province, commune, output_directory, watchdog=None,
+                          keep_records=True, resume=False, pipeline_workers=0,
+                          compact_records=False, aggregator=None, row_range=None, run_stats=None):
+    """
+    Main function that extracts all data from atlaimpianti with specific filters
+    
+    Args:
+        region (str): Region name (e.g., "ABRUZZO")
+        province (str): Province name (e.g., "Chieti") 
+        commune (str): Commune name (e.g., "LANCIANO")
+        output_directory (str): Directory where to save JSON files
+        watchdog (ResourceWatchdog): Resource watchdog, a default one is used if None
+        keep_records (bool): Keep every record in memory and return it; records are
+            always saved to disk, so this can be disabled for very large crawls.
+            A watchdog "flush" turns it off for the rest of the run and the
+            returned data is then empty (run_stats["records_released"] is set)
+        resume (bool): Continue from the checkpoint saved in output_directory
+        pipeline_workers (int): When > 0, only capture raw popup snapshots on the
+            browser thread and parse/save them in this many worker threads
+        compact_records (bool): Keep records in a RecordStore of CompactRecord
+            instead of a list of dicts, for crawls too large for plain dicts
+        aggregator (PlantAggregator): Updated with every record as it is emitted
+        row_range (tuple): (start, end) grid row indexes to process, for crawls
+            split into sub-jobs by the planner; None processes every row
+        run_stats (dict): Filled with grid_rows, records, seconds and completed
+            for the crawl planner
+    
+    Returns:
+        tuple: (records_saved, extracted_data) with number of saved records and data
+    """
+    
+    if watchdog is None:
+        watchdog = ResourceWatchdog()
+    
+    started = time.monotonic()
+    if run_stats is None:
+        run_stats = {}
+    
+    driver = create_driver()
+    pipeline = None
+    records_saved = 0
+    extracted_data = RecordStore() if compact_records else []
     
     try:
         print(f"🎯 Starting extraction for: {region} > {province} > {commune}")
         print(f"📁 JSON files will be saved in: {output_directory}")
         
-        url = "https://atla.gse.it/atlaimpianti/project/Atlaimpianti_Internet.html"
-        
         # Check connectivity
-        site_available, message = check_site_connectivity(url)
+        site_available, message = check_site_connectivity(ATLA_URL)
         if not site_available:
             print(f"❌ {message}")
             print("🔄 Attempting to continue anyway...")
         
-        # Load page
-        print("🌐 Loading page...")
-        driver.get(url)
-        
-        # Wait for page to load
-        WebDriverWait(driver, 30).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-        
-        WebDriverWait(driver, 45).until(
-            EC.any_of(
-                EC.presence_of_element_located((By.CLASS_NAME, "dijitDialog")),
-                EC.presence_of_element_located((By.XPATH, "//div[contains(@class,'dijitDialog') or @role='dialog']")),
-                EC.presence_of_element_located((By.TAG_NAME, "iframe"))
-            )
-        )
-        
-        print("✅ Page loaded successfully")
-        
-        # Handle initial dialog
-        try:
-            dialog = WebDriverWait(driver, 30).until(
-                EC.visibility_of_element_located((By.CLASS_NAME, "dijitDialog"))
-            )
-            
-            ok_button = WebDriverWait(driver, 15).until(
-                EC.element_to_be_clickable((By.XPATH, "//span[contains(@class,'dijitButtonContents') and .//span[contains(@class,'dijitButtonText') and contains(normalize-space(text()), 'Ok')]]"))
-            )
-            ok_button.click()
-            
-            WebDriverWait(driver, 30).until(EC.invisibility_of_element(dialog))
-            print("✅ Initial dialog handled successfully")
-        except:
-            print("⚠️ No initial dialog found, continuing...")
-        
-        # Initial navigation
-        full_xpath = "/html/body/div[8]/div[2]/div[2]/div/div[2]/div[1]/div/div/div[1]/div[2]/div/div/div/div/div[2]"
-        target = WebDriverWait(driver, 60).until(
-            EC.element_to_be_clickable((By.XPATH, full_xpath))
-        )
-        driver.execute_script("arguments[0].scrollIntoView(true); arguments[0].click();", target)
-        print("✅ Initial navigation completed")
+        scroll_element = open_filtered_grid(driver, region, province, commune)
         
-        # Apply filters
-        filters_successful = apply_filters(driver, region, province, commune)
-        
-        if not filters_successful:
+        if scroll_element is None:
             print("❌ Error applying filters, terminating execution")
             return 0, []
         
-        # Wait for table to update after applying filters
-        time.sleep(10)
-        scroll_element = WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "dojoxGridScrollbox"))
-        )
+        run_stats["grid_rows"] = count_grid_rows(driver)
+        if run_stats["grid_rows"] is not None:
+            print(f"📋 {run_stats['grid_rows']} rows match the filters")
+        if row_range is not None:
+            print(f"📐 Processing grid rows {row_range[0]} to {row_range[1] - 1}")
         
         # Extract data from all rows
         total_clicks = 0
-        extracted_data = []
+        processed_rows = set()
+        row_ordinals = {}
+        range_done = False
+        
+        filters_applied = {
+            "region": region,
+            "province": province,
+            "commune": commune
+        }
         
         # Create output directory
         os.makedirs(output_directory, exist_ok=True)
         
+        failed_clicks = []
+        records_released = False
+        
+        def emit(record):
+            # Single exit point for records whose JSON file has been written:
+            # in-memory copy, running aggregates and resume bookkeeping
+            nonlocal records_saved
+            records_saved += 1
+            processed_rows.add(row_signature(record["row_data"]))
+            if keep_records:
+                extracted_data.append(record)
+            if aggregator is not None:
+                aggregator.add(record)
+        
+        last_scroll_top = 0
+        
+        def current_scroll_top():
+            # A dead browser cannot report its scroll position, keep the last known one
+            nonlocal last_scroll_top
+            try:
+                last_scroll_top = driver.execute_script("return arguments[0].scrollTop;", scroll_element) or 0
+            except Exception:
+                pass
+            return last_scroll_top
+        
+        def write_checkpoint(scroll_top):
+            # Records, checkpoint and aggregates are written together so they always agree
+            if pipeline is not None:
+                pipeline.flush()
+            save_checkpoint(output_directory, total_clicks, scroll_top, processed_rows,
+                            aggregates=aggregator.to_dict() if aggregator is not None else None,
+                            records=records_saved)
+            if aggregator is not None:
+                aggregator.save(os.path.join(output_directory, AGGREGATES_FILENAME))
+        
+        if pipeline_workers > 0:
+            pipeline = RecordPipeline(output_directory, workers=pipeline_workers, on_record=emit)
+            print(f"⚙️ Pipelined mode: {pipeline_workers} parsing worker(s)")
+        
+        if resume:
+            checkpoint = load_checkpoint(output_directory)
+            if checkpoint:
+                total_clicks = checkpoint["total_clicks"]
+                records_saved = checkpoint.get("records", total_clicks)
+                processed_rows.update(checkpoint["processed_rows"])
+                if aggregator is not None and checkpoint.get("aggregates"):
+                    aggregator.merge(PlantAggregator.from_dict(checkpoint["aggregates"]))
+                last_scroll_top = checkpoint["scroll_top"]
+                driver.execute_script("arguments[0].scrollTop = arguments[1];", scroll_element, last_scroll_top)
+                print(f"🔄 Resuming from checkpoint: {records_saved} records already saved")
+        
+        # Sub-jobs start at their first row, unless a checkpoint already put the grid further
+        if row_range is not None and row_range[0] > 0 and not last_scroll_top:
+            scroll_to_row(driver, scroll_element, row_range[0])
+        
         print("🚀 STARTING COMPLETE TABLE TRAVERSAL")
         
+        browser_failures = 0
+        completed = True
+        
         while True:
+            recycle_action = None
+            browser_failed = False
+            
             try:
                 time.sleep(2)
-                rows = driver.find_elements(By.CSS_SELECTOR, "div.dojoxGridRow")
-            except (NoSuchWindowException, WebDriverException):
-                break
+                rows = driver.find_elements(*SELECTORS.locator("grid_row"))
+            except WebDriverException as e:
+                print(f"⚠️ Browser error while reading the grid: {e}")
+                rows = []
+                recycle_action = "browser"
+                browser_failed = True
             
-            if not rows:
+            if not rows and not browser_failed:
                 print("❌ No visible rows")
                 break
             
-            print(f"📋 {len(rows)} rows on screen")
+            if rows:
+                print(f"📋 {len(rows)} rows on screen")
             
             # Process all visible rows
             for i in range(len(rows)):
                 try:
                     # Re-get rows to avoid stale element reference
-                    updated_rows = driver.find_elements(By.CSS_SELECTOR, "div.dojoxGridRow")
+                    updated_rows = driver.find_elements(*SELECTORS.locator("grid_row"))
                     if i >= len(updated_rows):
                         break
                     row = updated_rows[i]
@@ -653,13 +1009,35 @@ def extract_complete_data(region, province, commune, output_directory):
                     if not row.is_displayed():
                         continue
                     
-                    # Extract row data first
-                    row_data = extract_row_data(row)
+                    row_data = None
+                    
+                    if row_range is not None:
+                        # One round trip for the index, the cells are only read for rows in range
+                        row_index = driver.execute_script("return arguments[0].gridRowIndex;", row)
+                        if row_index is None:
+                            # Fall back to the order in which rows are first seen
+                            row_data = extract_row_data(row)
+                            row_index = row_ordinals.setdefault(row_signature(row_data), len(row_ordinals))
+                        if row_index < row_range[0]:
+                            continue
+                        if row_index >= row_range[1]:
+                            range_done = True
+                            break
+                    
+                    if row_data is None:
+                        row_data = extract_row_data(row)
                     
                     # Check if it's BIOGAS (filter condition)
                     if row_data.get('column_6') != "BIOGAS":
                         continue
                     
+                    # Skip rows saved before a recycle or a resumed run
+                    signature = row_signature(row_data)
+                    if signature in processed_rows:
+                        continue
+                    
+                    record_started = time.monotonic()
+                    
                     # Click on row
                     try:
                         row.click()
@@ -672,16 +1050,27 @@ def extract_complete_data(region, province, commune, output_directory):
                     # Wait for popup
                     try:
                         popup = WebDriverWait(driver, 30).until(
-                            EC.visibility_of_element_located((By.CLASS_NAME, "dojoxFloatingPane"))
+                            EC.visibility_of_element_located(SELECTORS.locator("popup"))
                         )
                     except:
                         continue
                     
+                    # The close icon and tabs are used by every record: check them on the
+                    # first popup of each page session instead of paying their timeouts per record
+                    if "popup" not in SELECTORS.checked_phases:
+                        check_when_ready(driver, "popup", "popup_tab", timeout=CHOICE_TIMEOUT)
+                    
                     total_clicks += 1
                     print(f"✅ Click #{total_clicks}")
                     
-                    # Extract popup information
-                    popup_info = extract_popup_data(driver, popup)
+                    if pipeline is not None:
+                        # Capture the raw popup and let the workers parse and save it
+                        # (the row is marked as processed by emit once its file is written)
+                        pipeline.submit(total_clicks, row_data, capture_popup_snapshot(driver, popup), filters_applied)
+                        popup_info = None
+                    else:
+                        # Extract popup information
+                        popup_info = extract_popup_data(driver, popup)
                     
                     # Combine all information
                     if popup_info:
@@ -689,15 +1078,9 @@ def extract_complete_data(region, province, commune, output_directory):
                             "click_number": total_clicks,
                             "row_data": row_data,
                             "popup_data": popup_info,
-                            "filters_applied": {
-                                "region": region,
-                                "province": province,
-                                "commune": commune
-                            }
+                            "filters_applied": filters_applied
                         }
                         
-                        extracted_data.append(complete_record)
-                        
                         # Save individual JSON file
                         filename = f"record_{total_clicks:04d}.json"
                         filepath = os.path.join(output_directory, filename)
@@ -705,38 +1088,146 @@ def extract_complete_data(region, province, commune, output_directory):
                         with open(filepath, 'w', encoding='utf-8') as f:
                             json.dump(complete_record, f, ensure_ascii=False, indent=2)
                         
+                        emit(complete_record)
                         print(f"💾 Saved: {filename}")
+                    elif pipeline is None:
+                        failed_clicks.append(total_clicks)
                     
+                    browser_failures = 0
+                    watchdog.record_latency(time.monotonic() - record_started)
+                    
+                    if watchdog.sample_due:
+                        write_checkpoint(current_scroll_top())
+                    actions = watchdog.check(driver)
+                    if "flush" in actions and keep_records:
+                        # Records are already on disk: drop the in-memory copies and stop
+                        # keeping new ones, clearing again would not lower the RSS
+                        print(f"🧹 Releasing {len(extracted_data)} in-memory records, "
+                              f"the rest of the run keeps records on disk only")
+                        extracted_data.clear()
+                        keep_records = False
+                        records_released = True
+                        watchdog.notify_recycled("flush")
+                    if "browser" in actions:
+                        recycle_action = "browser"
+                    elif "page" in actions:
+                        recycle_action = "page"
+                    if recycle_action:
+                        break
+                    
+                except SelectorDriftError:
+                    raise
+                except WebDriverException as e:
+                    if not browser_is_alive(driver):
+                        print(f"⚠️ Browser stopped responding: {e}")
+                        recycle_action = "browser"
+                        browser_failed = True
+                        break
+                    print(f"⚠️ Error processing row {i}: {e}")
+                    continue
                 except Exception as e:
                     print(f"⚠️ Error processing row {i}: {e}")
                     continue
             
-            # Try to scroll down to get more rows
-            try:
-                driver.execute_script("arguments[0].scrollTop += 500;", scroll_element)
-                time.sleep(2)
-                
-                # Check if we have new rows
-                new_rows = driver.find_elements(By.CSS_SELECTOR, "div.dojoxGridRow")
-                if len(new_rows) <= len(rows):
-                    print("📋 No more rows found, extraction complete")
+            if range_done:
+                print("📐 End of the assigned row range")
+                break
+            
+            if recycle_action is None:
+                # Try to scroll down to get more rows
+                try:
+                    driver.execute_script("arguments[0].scrollTop += 500;", scroll_element)
+                    time.sleep(2)
+                    
+                    # Check if we have new rows
+                    new_rows = driver.find_elements(*SELECTORS.locator("grid_row"))
+                    if len(new_rows) <= len(rows):
+                        print("📋 No more rows found, extraction complete")
+                        break
+                    continue
+                except Exception as e:
+                    if browser_is_alive(driver):
+                        print(f"⚠️ Error scrolling the grid: {e}")
+                        break
+                    print(f"⚠️ Browser stopped responding: {e}")
+                    recycle_action = "browser"
+                    browser_failed = True
+            
+            if browser_failed:
+                browser_failures += 1
+                if browser_failures > MAX_BROWSER_FAILURES:
+                    print(f"❌ Browser failed {browser_failures} times in a row without progress, terminating execution")
+                    completed = False
                     break
+            
+            if recycle_action:
+                write_checkpoint(current_scroll_top())
+                
+                # A failed recycle ends the run through the normal summary below,
+                # everything saved so far is already in the checkpoint
+                try:
+                    if recycle_action == "browser":
+                        print("♻️ Restarting browser...")
+                        try:
+                            driver.quit()
+                        except:
+                            pass
+                        driver = create_driver()
+                    else:
+                        print("♻️ Reloading page...")
                     
-            except:
-                break
+                    scroll_element = open_filtered_grid(driver, region, province, commune)
+                    if scroll_element is None:
+                        print("❌ Error re-applying filters after recycle, terminating execution")
+                        completed = False
+                        break
+                    
+                    driver.execute_script("arguments[0].scrollTop = arguments[1];", scroll_element, last_scroll_top)
+                    if row_range is not None and row_range[0] > 0 and not last_scroll_top:
+                        scroll_to_row(driver, scroll_element, row_range[0])
+                except Exception as e:
+                    print(f"❌ Error during {recycle_action} recycle, terminating execution: {e}")
+                    completed = False
+                    break
+                watchdog.notify_recycled(recycle_action)
+        
+        write_checkpoint(current_scroll_top())
+        if pipeline is not None:
+            pipeline.close()
+            failed_clicks.extend(pipeline.failed)
         
-        print(f"🎯 EXTRACTION COMPLETED")
+        run_stats["records"] = records_saved
+        run_stats["failed_records"] = len(failed_clicks)
+        run_stats["seconds"] = time.monotonic() - started
+        run_stats["completed"] = completed
+        run_stats["records_released"] = records_released
+        
+        if completed:
+            print(f"🎯 EXTRACTION COMPLETED")
+        else:
+            print(f"⚠️ EXTRACTION STOPPED EARLY, run again with --resume to continue")
         print(f"   📋 Filters: {region} > {province} > {commune}")
-        print(f"   ✅ Total records extracted: {total_clicks}")
+        print(f"   ✅ Total records extracted: {records_saved}")
+        if failed_clicks:
+            print(f"   ❌ Records not saved: {len(failed_clicks)} (clicks {', '.join(f'#{n}' for n in sorted(failed_clicks))}), "
+                  f"their rows are crawled again with --resume")
+        print(f"   ♻️ Page reloads: {watchdog.stats['page_recycles']}, browser restarts: {watchdog.stats['browser_restarts']}")
+        if records_released:
+            print(f"   🧹 In-memory records were released to save memory, read them from the JSON files")
         print(f"   📁 Files saved in: {output_directory}")
         
-        return total_clicks, extracted_data
+        return records_saved, extracted_data
         
     except Exception as e:
         print(f"❌ Error during extraction: {e}")
-        return 0, []
+        # Records written before the error stay on disk and count for the caller
+        run_stats["records"] = records_saved
+        run_stats["completed"] = False
+        return records_saved, extracted_data
         
     finally:
+        if pipeline is not None:
+            pipeline.close()
         try:
             driver.quit()
             print("🔒 Browser closed successfully")
@@ -0,0 +1,347 @@
+import json
+import os
+
+
+# Bump when the site layout changes and the locators below are updated
+SELECTOR_MAP_VERSION = "2024.1"
+
+# Strategy names match selenium.webdriver.common.by.By values, so this module
+# does not need to import Selenium (keeps validate-config startup fast)
+CSS = "css selector"
+XPATH = "xpath"
+
+# Phases tell the health check when a selector is expected to be in the DOM:
+#   page   - after the page is loaded, before opening the plants grid
+#   filter - as soon as the filter popup is visible (the toolbar button is still there)
+#   choice - inside choice windows created lazily by the filter popup, checked one
+#            window at a time with the selectors argument of health_check
+#   grid   - after the filters are applied (rows and cells are optional: a commune
+#            may have no plants)
+#   popup  - inside a plant popup
+# Optional selectors are reported but never fail the health check.
+SELECTOR_DEFINITIONS = {
+    # Page
+    "initial_dialog": {"phase": "page", "optional": True, "css": ".dijitDialog"},
+    "dialog_ok_button": {
+        "phase": "page", "optional": True,
+        "xpath": "//span[contains(@class,'dijitButtonContents') and .//span[contains(@class,'dijitButtonText') and contains(normalize-space(text()), 'Ok')]]",
+    },
+    "grid_panel": {
+        "phase": "page",
+        "xpath": "/html/body/div[8]/div[2]/div[2]/div/div[2]/div[1]/div/div/div[1]/div[2]/div/div/div/div/div[2]",
+    },
+    "filter_button": {
+        "phase": "filter",
+        "css": "#gwClassListDataGrid_impianti_internet_Toolbar > span:nth-of-type(2)",
+        "xpath": '//*[@id="gwClassListDataGrid_impianti_internet_Toolbar"]/span[2]',
+    },
+
+    # Filter popup
+    "floating_pane": {"phase": "filter", "css": ".dojoxFloatingPane"},
+    "initial_widget": {"phase": "filter", "css": "#widget_sf_value_137603", "xpath": '//*[@id="widget_sf_value_137603"]'},
+    "region_widget": {"phase": "filter", "css": "#widget_sf_value_137615", "xpath": '//*[@id="widget_sf_value_137615"]'},
+    "province_widget": {"phase": "filter", "css": "#widget_sf_value_137614", "xpath": '//*[@id="widget_sf_value_137614"]'},
+    "commune_widget": {"phase": "filter", "css": "#sf_value_137616", "xpath": '//*[@id="sf_value_137616"]'},
+    "filter_apply_button": {
+        "phase": "filter",
+        "css": "#dijit_Toolbar_2 > span:nth-of-type(3)",
+        "xpath": '//*[@id="dijit_Toolbar_2"]/span[3]',
+    },
+    "filter_close_button": {
+        "phase": "filter",
+        "css": "#gwFP_filter_137591 > div:nth-of-type(1) > span:nth-of-type(1)",
+        "xpath": '//*[@id="gwFP_filter_137591"]/div[1]/span[1]',
+    },
+
+    # Choice windows
+    "initial_choice": {"phase": "choice", "css": "#windowChoice_137603_rowSelector_0", "xpath": '//*[@id="windowChoice_137603_rowSelector_0"]'},
+    "choice_toolbar": {
+        "phase": "choice",
+        "css": "#dijit_Toolbar_{n} > span",
+        "xpath": '//*[@id="dijit_Toolbar_{n}"]/span',
+        "defaults": {"n": 3},
+    },
+    "region_field": {"phase": "choice", "css": "#filterColumnTop_ai_regione", "xpath": '//*[@id="filterColumnTop_ai_regione"]'},
+    "region_choice": {"phase": "choice", "css": "#windowChoice_137615_rowSelector_0", "xpath": '//*[@id="windowChoice_137615_rowSelector_0"]'},
+    "province_field": {"phase": "choice", "css": "#filterColumnTop_nome_pro", "xpath": '//*[@id="filterColumnTop_nome_pro"]'},
+    "province_choice": {"phase": "choice", "css": "#windowChoice_137614_rowSelector_0", "xpath": '//*[@id="windowChoice_137614_rowSelector_0"]'},
+    "commune_field": {"phase": "choice", "css": "#filterColumnTop_ai_comune", "xpath": '//*[@id="filterColumnTop_ai_comune"]'},
+    "commune_choice_table": {"phase": "choice", "css": '[id*="windowChoice_137616"] tr'},
+    "commune_choice_rows": {"phase": "choice", "css": '[id*="windowChoice_137616"] tr[class*="dojoxGridRow"]'},
+    "commune_choice": {
+        "phase": "choice",
+        "css": "#windowChoice_137616_rowSelector_{i}",
+        "xpath": '//*[@id="windowChoice_137616_rowSelector_{i}"]',
+        "defaults": {"i": 0},
+    },
+
+    # Results grid
+    "grid_scrollbox": {"phase": "grid", "css": ".dojoxGridScrollbox"},
+    "grid_row": {"phase": "grid", "optional": True, "css": "div.dojoxGridRow"},
+    "grid_cell": {"phase": "grid", "optional": True, "css": ".dojoxGridCell"},
+    "grid_widget": {"phase": "grid", "optional": True, "css": "#gwClassListDataGrid_impianti_internet"},
+
+    # Plant popup
+    "popup": {"phase": "popup", "css": ".dojoxFloatingPane"},
+    "popup_title": {"phase": "popup", "css": ".dijitTitleNode"},
+    "popup_close_button": {"phase": "popup", "css": ".dojoxFloatingCloseIcon"},
+    "popup_tab": {
+        "phase": "popup",
+        "xpath": "//span[@class='tabLabel' and text()='{label}']",
+        "defaults": {"label": "Dati Tecnici"},
+    },
+    "popup_tab_table": {
+        "phase": "popup", "optional": True,
+        "css": "#dijit_layout_TabContainer_1 > div:nth-of-type(3)",
+        "xpath": '//*[@id="dijit_layout_TabContainer_1"]/div[3]',
+    },
+}
+
+# Evaluates every strategy of every selector in a single round trip.
+# arguments[0] is a list of [name, [[strategy, value], ...]], the result maps
+# each name to the index of the first strategy that matched, or -1.
+HEALTH_CHECK_SCRIPT = """
+var specs = arguments[0];
+var result = {};
+for (var i = 0; i < specs.length; i++) {
+    var name = specs[i][0], strategies = specs[i][1];
+    result[name] = -1;
+    for (var j = 0; j < strategies.length; j++) {
+        var node = null;
+        try {
+            if (strategies[j][0] === 'css selector') {
+                node = document.querySelector(strategies[j][1]);
+            } else {
+                node = document.evaluate(strategies[j][1], document, null,
+                    XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+            }
+        } catch (e) {
+            node = null;
+        }
+        if (node) {
+            result[name] = j;
+            break;
+        }
+    }
+}
+return result;
+"""
+
+
+class SelectorDriftError(Exception):
+    """
+    Raised when required selectors are missing from the page
+    """
+
+    def __init__(self, phase, missing, version):
+        self.phase = phase
+        self.missing = missing
+        self.version = version
+        super().__init__(
+            f"Selector map {version}: {len(missing)} selector(s) missing in phase '{phase}': {', '.join(missing)}"
+        )
+
+
+class SelectorMap:
+    """
+    Versioned collection of site locators with precompiled strategies and a
+    per page session cache of resolved elements
+    """
+
+    def __init__(self, definitions=None, version=SELECTOR_MAP_VERSION):
+        """
+        Args:
+            definitions (dict): Selector definitions, SELECTOR_DEFINITIONS if None
+            version (str): Version of the definitions
+        """
+        self.definitions = definitions if definitions is not None else SELECTOR_DEFINITIONS
+        self.version = version
+        self.preferred = {}
+        self.compiled = {}
+        self.session_id = None
+        self.element_cache = {}
+        self.checked_phases = set()
+
+        for name, definition in self.definitions.items():
+            if not definition.get("css") and not definition.get("xpath"):
+                raise ValueError(f"Selector '{name}' has neither a css nor an xpath strategy")
+            if "defaults" not in definition:
+                self.compiled[(name, ())] = self._compile(name, {})
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Load selector definitions from a JSON or YAML file with 'version' and 'selectors' keys,
+        so locators can be updated without a code change when the site renumbers its widgets
+
+        Args:
+            path (str): Path to the selector file
+
+        Returns:
+            SelectorMap: Selector map built from the file
+        """
+        with open(path, 'r', encoding='utf-8') as f:
+            if os.path.splitext(path)[1].lower() in (".yml", ".yaml"):
+                import yaml
+                data = yaml.safe_load(f)
+            else:
+                data = json.load(f)
+
+        definitions = dict(SELECTOR_DEFINITIONS)
+        definitions.update(data.get("selectors", {}))
+        return cls(definitions, version=str(data.get("version", SELECTOR_MAP_VERSION)))
+
+    def _compile(self, name, params):
+        definition = self.definitions[name]
+        values = dict(definition.get("defaults", {}))
+        values.update(params)
+
+        strategies = []
+        if definition.get("css"):
+            strategies.append((CSS, definition["css"].format(**values)))
+        if definition.get("xpath"):
+            strategies.append((XPATH, definition["xpath"].format(**values)))
+        return strategies
+
+    def strategies(self, name, **params):
+        """
+        Return every (strategy, value) locator of a selector, compiled once per parameter set
+        """
+        if name not in self.definitions:
+            raise KeyError(f"Unknown selector '{name}'")
+
+        key = (name, tuple(sorted(params.items())))
+        if key not in self.compiled:
+            self.compiled[key] = self._compile(name, params)
+        return self.compiled[key]
+
+    def locator(self, name, **params):
+        """
+        Return the (By, value) tuple to use for a selector; defaults to the CSS strategy
+        unless the health check found that only a fallback strategy matches the page
+
+        Args:
+            name (str): Selector name
+            **params: Values for templated selectors (e.g., i=3)
+
+        Returns:
+            tuple: Locator usable with find_element and expected_conditions
+        """
+        strategies = self.strategies(name, **params)
+        index = self.preferred.get(name, 0)
+        return strategies[index] if index < len(strategies) else strategies[0]
+
+    def reset_session(self, driver=None):
+        """
+        Forget the resolved elements and checked phases, to be called whenever the
+        page is (re)loaded
+        """
+        self.element_cache = {}
+        self.checked_phases = set()
+        self.session_id = getattr(driver, "session_id", None)
+
+    def cached_element(self, driver, name, **params):
+        """
+        Return the element resolved earlier in this page session, None if it is
+        unknown or no longer attached to the DOM
+        """
+        if getattr(driver, "session_id", None) != self.session_id:
+            self.reset_session(driver)
+            return None
+
+        key = (name, tuple(sorted(params.items())))
+        element = self.element_cache.get(key)
+        if element is None:
+            return None
+        try:
+            element.is_enabled()  # Raises StaleElementReferenceException when detached
+            return element
+        except Exception:
+            del self.element_cache[key]
+            return None
+
+    def remember(self, driver, name, element, **params):
+        """
+        Store a resolved element for the current page session
+        """
+        if getattr(driver, "session_id", None) != self.session_id:
+            self.reset_session(driver)
+        self.element_cache[(name, tuple(sorted(params.items())))] = element
+
+    def health_check(self, driver, phases, selectors=None):
+        """
+        Validate all selectors of the given phases against the page in one execute_script call
+
+        Args:
+            driver: WebDriver instance
+            phases (str or list): Phase names (e.g., "page", ["filter", "grid"])
+            selectors (list): Only check these selectors of the phases, as names or
+                (name, params) tuples for templated selectors (e.g., ("choice_toolbar", {"n": 4}))
+
+        Returns:
+            dict: {"missing": [...], "optional_missing": [...], "fallback": [...]}
+
+        Raises:
+            SelectorDriftError: If a required selector matches none of its strategies
+        """
+        if isinstance(phases, str):
+            phases = [phases]
+
+        if selectors is None:
+            params = {name: {} for name, definition in self.definitions.items() if definition["phase"] in phases}
+        else:
+            params = dict(item if isinstance(item, tuple) else (item, {}) for item in selectors)
+            params = {name: values for name, values in params.items() if self.definitions[name]["phase"] in phases}
+        names = list(params)
+        specs = [[name, [list(s) for s in self.strategies(name, **params[name])]] for name in names]
+        matches = driver.execute_script(HEALTH_CHECK_SCRIPT, specs) or {}
+
+        report = {"missing": [], "optional_missing": [], "fallback": []}
+        for name in names:
+            index = matches.get(name, -1)
+            if index < 0:
+                if self.definitions[name].get("optional"):
+                    report["optional_missing"].append(name)
+                else:
+                    report["missing"].append(name)
+                continue
+            self.preferred[name] = index
+            if index > 0:
+                report["fallback"].append(name)
+
+        phase_label = "+".join(phases)
+        if report["fallback"]:
+            print(f"⚠️ Selectors matched only by fallback strategy ({phase_label}): {', '.join(report['fallback'])}")
+        if report["missing"]:
+            raise SelectorDriftError(phase_label, report["missing"], self.version)
+
+        if selectors is None:
+            self.checked_phases.update(phases)
+        print(f"✅ Selector health check passed ({phase_label}, {len(names)} selectors, map {self.version})")
+        return report
+
+
+def validate_definitions(definitions):
+    """
+    Check selector definitions without a browser
+
+    Returns:
+        list: Error messages, empty if the definitions are valid
+    """
+    phases = {"page", "filter", "choice", "grid", "popup"}
+    errors = []
+    for name, definition in definitions.items():
+        if not isinstance(definition, dict):
+            errors.append(f"Selector '{name}' must be a mapping")
+            continue
+        if definition.get("phase") not in phases:
+            errors.append(f"Selector '{name}' has an unknown phase '{definition.get('phase')}'")
+        if not definition.get("css") and not definition.get("xpath"):
+            errors.append(f"Selector '{name}' has neither a css nor an xpath strategy")
+        for strategy in ("css", "xpath"):
+            if definition.get(strategy):
+                try:
+                    definition[strategy].format(**definition.get("defaults", {}))
+                except (KeyError, IndexError, ValueError) as e:
+                    errors.append(f"Selector '{name}' {strategy} template is invalid: {e}")
+    return errors
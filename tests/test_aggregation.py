@@ -0,0 +1,114 @@
+import pytest
+
+from aggregation import PlantAggregator, parse_number
+from resource_watchdog import load_checkpoint, save_checkpoint
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("999", 999.0),
+    ("999 kW", 999.0),
+    ("0.999", 0.999),
+    ("-0.250", -0.25),
+    ("1.234", 1234.0),
+    ("1.234.567", 1234567.0),
+    ("1.234,5", 1234.5),
+    ("1,234.5", 1234.5),
+    ("12,5", 12.5),
+    ("1234.5", 1234.5),
+    ("0.5", 0.5),
+    ("-3", -3.0),
+    ("", None),
+    (None, None),
+    ("n.d.", None),
+])
+def test_parse_number(text, expected):
+    assert parse_number(text) == expected
+
+
+def make_record(commune="LANCIANO", capacity="999", source="BIOGAS", date="12/05/2011"):
+    return {
+        "row_data": {"column_6": source},
+        "popup_data": {"table_data": {
+            "Dati Tecnici_Potenza (kW)": capacity,
+            "Dati Tecnici_Data entrata in esercizio": date,
+        }},
+        "filters_applied": {"commune": commune},
+    }
+
+
+RECORDS = [
+    make_record(),
+    make_record(capacity="1.250,5", date="2019"),
+    make_record(commune="ORTONA", capacity="", source="SOLARE", date=""),
+    make_record(commune="ORTONA", capacity="40"),
+]
+
+
+def test_add():
+    aggregator = PlantAggregator()
+    for record in RECORDS:
+        aggregator.add(record)
+
+    lanciano = aggregator.groups["LANCIANO"]
+    assert lanciano["plants"] == 2
+    assert lanciano["total_capacity"] == pytest.approx(2249.5)
+    assert lanciano["by_year"] == {"2011": 1, "2019": 1}
+    assert aggregator.groups["ORTONA"]["plants_with_capacity"] == 1
+    assert aggregator.groups["ORTONA"]["by_source"] == {"SOLARE": 1, "BIOGAS": 1}
+    assert aggregator.total_plants == 4
+
+
+def test_merge_equals_single_pass():
+    single = PlantAggregator()
+    for record in RECORDS:
+        single.add(record)
+
+    first, second = PlantAggregator(), PlantAggregator()
+    for record in RECORDS[:2]:
+        first.add(record)
+    for record in RECORDS[2:]:
+        second.add(record)
+
+    assert first.merge(second).groups == single.groups
+
+
+def test_resume_from_checkpoint_does_not_double_count(tmp_path):
+    before_crash = PlantAggregator()
+    for record in RECORDS[:3]:
+        before_crash.add(record)
+    save_checkpoint(str(tmp_path), 3, 0, {"a", "b", "c"}, aggregates=before_crash.to_dict())
+
+    # A resumed run restores the checkpointed state, then adds only the remaining rows
+    checkpoint = load_checkpoint(str(tmp_path))
+    resumed = PlantAggregator().merge(PlantAggregator.from_dict(checkpoint["aggregates"]))
+    resumed.add(RECORDS[3])
+
+    single = PlantAggregator()
+    for record in RECORDS:
+        single.add(record)
+    assert resumed.groups == single.groups
+    assert checkpoint["records"] == 3
+
+
+def test_save_and_load(tmp_path):
+    aggregator = PlantAggregator(capacity_fields=["Potenza"])
+    for record in RECORDS:
+        aggregator.add(record)
+    path = str(tmp_path / "aggregates.json")
+    aggregator.save(path)
+
+    loaded = PlantAggregator.load(path)
+    assert loaded.groups == aggregator.groups
+    assert loaded.capacity_fields == ["Potenza"]
+
+
+def test_write_report(tmp_path):
+    aggregator = PlantAggregator()
+    for record in RECORDS:
+        aggregator.add(record)
+
+    written = aggregator.write_report(str(tmp_path), formats=("csv", "md"))
+    assert sorted(path.rsplit("/", 1)[-1] for path in written) == [
+        "summary.md", "summary_by_commune.csv", "summary_by_source.csv", "summary_by_year.csv",
+    ]
+    assert "Total plants: 4" in (tmp_path / "summary.md").read_text(encoding="utf-8")
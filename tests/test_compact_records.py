@@ -0,0 +1,78 @@
+import copy
+import pickle
+
+import pytest
+
+from compact_records import CompactRecord, FilterContext, RecordStore
+
+
+def make_record(click_number=1, commune="LANCIANO"):
+    return {
+        "click_number": click_number,
+        "row_data": {"column_1": f"IM{click_number:04d}", "column_6": "BIOGAS"},
+        "popup_data": {
+            "title": f"Impianto {click_number}",
+            "table_data": {"Dati Tecnici_Potenza (kW)": "999", "Ubicazione_Comune": commune},
+            "geometry_point": "POINT (14.39 42.23)",
+            "coordinate_x": 14.39,
+            "coordinate_y": 42.23,
+        },
+        "filters_applied": {"region": "ABRUZZO", "province": "Chieti", "commune": commune},
+    }
+
+
+def test_round_trip():
+    record = make_record()
+    assert CompactRecord.from_dict(record).to_dict() == record
+
+
+def test_schemas_and_filters_are_shared():
+    first = CompactRecord.from_dict(make_record(1))
+    second = CompactRecord.from_dict(make_record(2))
+    assert first.row_keys is second.row_keys
+    assert first.field_names is second.field_names
+    assert first.filters is second.filters
+
+
+def test_flat_items_column_names():
+    columns = [name for name, _ in CompactRecord.from_dict(make_record()).flat_items()]
+    assert columns == [
+        "click_number",
+        "row_data.column_1",
+        "row_data.column_6",
+        "popup_data.title",
+        "popup_data.table_data.Dati Tecnici_Potenza (kW)",
+        "popup_data.table_data.Ubicazione_Comune",
+        "popup_data.geometry_point",
+        "popup_data.coordinate_x",
+        "popup_data.coordinate_y",
+        "filters_applied.region",
+        "filters_applied.province",
+        "filters_applied.commune",
+    ]
+
+
+def test_flat_items_match_json_normalize():
+    pd = pytest.importorskip("pandas")
+    record = make_record()
+    expected = pd.json_normalize([record], sep=".").iloc[0].to_dict()
+    assert dict(CompactRecord.from_dict(record).flat_items()) == expected
+
+
+def test_filter_context_pickle_and_copy():
+    context = FilterContext.shared({"region": "ABRUZZO", "province": "Chieti", "commune": "LANCIANO"})
+    assert pickle.loads(pickle.dumps(context)) == context
+    assert copy.deepcopy(context) == context
+
+    record = CompactRecord.from_dict(make_record())
+    assert pickle.loads(pickle.dumps(record)) == record
+
+
+def test_record_store_behaves_like_a_list_of_dicts():
+    store = RecordStore()
+    store.append(make_record(1))
+    store.append(CompactRecord.from_dict(make_record(2)))
+    assert len(store) == 2
+    assert [record["click_number"] for record in store] == [1, 2]
+    store.clear()
+    assert len(store) == 0
@@ -0,0 +1,89 @@
+import pytest
+
+from crawl_planner import CrawlJob, plan_jobs, predict_makespan, split_job, update_metrics
+
+
+def make_job(commune, seconds, rows=None):
+    return CrawlJob("ABRUZZO", "Chieti", commune, estimated_seconds=seconds, rows=rows)
+
+
+def test_split_job_covers_every_row_once():
+    parts = split_job(make_job("LANCIANO", 1000, rows=10), 3)
+    assert [job.row_range for job in parts] == [(0, 4), (4, 8), (8, 10)]
+    assert all(job.parts == 3 for job in parts)
+    assert sum(job.estimated_seconds for job in parts) == pytest.approx(1000)
+
+
+def test_split_job_never_creates_empty_ranges():
+    parts = split_job(make_job("LANCIANO", 100, rows=2), 4)
+    assert [job.row_range for job in parts] == [(0, 1), (1, 2)]
+
+
+def test_plan_jobs_splits_long_communes_and_orders_longest_first():
+    jobs = [make_job("SMALL", 100, rows=10), make_job("LARGE", 900, rows=90), make_job("MEDIUM", 300, rows=30)]
+    planned = plan_jobs(jobs, workers=2, max_split=4)
+
+    large = [job for job in planned if job.commune == "LARGE"]
+    assert len(large) == 2
+    assert [job.estimated_seconds for job in planned] == sorted((job.estimated_seconds for job in planned), reverse=True)
+    assert predict_makespan(planned, 2) < predict_makespan(sorted(jobs, key=lambda job: job.commune), 2)
+
+
+def test_plan_jobs_does_not_split_without_row_count():
+    planned = plan_jobs([make_job("UNKNOWN", 900), make_job("SMALL", 100, rows=10)], workers=2)
+    assert [job.commune for job in planned] == ["UNKNOWN", "SMALL"]
+
+
+def test_plan_jobs_single_worker_keeps_jobs_whole():
+    planned = plan_jobs([make_job("LARGE", 900, rows=90), make_job("SMALL", 100, rows=10)], workers=1)
+    assert all(job.parts == 1 for job in planned)
+
+
+def test_predict_makespan():
+    jobs = [make_job("A", 5), make_job("B", 4), make_job("C", 3), make_job("D", 3)]
+    assert predict_makespan(jobs, 2) == 8
+    assert predict_makespan(jobs, 1) == 15
+
+
+def result(records=10, grid_rows=20, seconds=100.0, completed=True):
+    return {"records": records, "failed_records": 0, "grid_rows": grid_rows, "seconds": seconds, "completed": completed}
+
+
+def test_update_metrics_records_completed_jobs():
+    job = make_job("LANCIANO", 100)
+    job.result = result()
+    assert update_metrics({}, [job]) == {"ABRUZZO|Chieti|LANCIANO": {"rows": 20, "records": 10, "seconds": 100.0}}
+
+
+def test_update_metrics_keeps_completed_communes_without_records():
+    job = make_job("NO_BIOGAS", 100)
+    job.result = result(records=0, grid_rows=35, seconds=60.0)
+    assert update_metrics({}, [job]) == {"ABRUZZO|Chieti|NO_BIOGAS": {"rows": 35, "records": 0, "seconds": 60.0}}
+
+
+def test_update_metrics_sums_sub_jobs():
+    parts = split_job(make_job("LANCIANO", 100, rows=20), 2)
+    for job in parts:
+        job.result = result(records=5, seconds=40.0)
+    metrics = update_metrics({}, parts)
+    assert metrics["ABRUZZO|Chieti|LANCIANO"] == {"rows": 20, "records": 10, "seconds": 80.0}
+
+
+@pytest.mark.parametrize("job_result", [
+    {"error": "Chrome crashed"},
+    result(records=0, grid_rows=None, seconds=3.0, completed=False),
+    result(grid_rows=None),
+    result(completed=False),
+])
+def test_update_metrics_skips_failed_jobs(job_result):
+    previous = {"ABRUZZO|Chieti|LANCIANO": {"rows": 20, "records": 10, "seconds": 100.0}}
+    job = make_job("LANCIANO", 100)
+    job.result = job_result
+    assert update_metrics(dict(previous), [job]) == previous
+
+
+def test_update_metrics_skips_partially_failed_communes():
+    parts = split_job(make_job("LANCIANO", 100, rows=20), 2)
+    parts[0].result = result(records=5)
+    parts[1].result = {"error": "Chrome crashed"}
+    assert update_metrics({}, parts) == {}
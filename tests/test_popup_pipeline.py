@@ -0,0 +1,113 @@
+import json
+import os
+
+from popup_pipeline import (HIDDEN_ATTRIBUTE, TAB_TABLE_ATTRIBUTE, RecordPipeline, extract_tab_snapshot,
+                            parse_html, parse_point, parse_popup_snapshot)
+
+
+TAB_HTML = f"""
+<div class="dojoxFloatingPane">
+  <div id="dijit_layout_TabContainer_1">
+    <div>tabs</div>
+    <div>buttons</div>
+    <div {TAB_TABLE_ATTRIBUTE}>
+      <table><tbody>
+        <tr><td>N</td><td>1</td></tr>
+        <tr><td><span>Potenza (kW)</span></td><td><div><span>999</span></div></td></tr>
+        <tr><td>Stato</td><td>In esercizio</td></tr>
+      </tbody></table>
+    </div>
+  </div>
+</div>
+"""
+
+
+def test_text_keeps_block_boundaries():
+    root = parse_html("<div>Indirizzo<br>Via Roma  1<div>LANCIANO</div><span>CH</span></div>")
+    assert root.text() == "Indirizzo\nVia Roma 1\nLANCIANO\nCH"
+
+
+def test_text_separates_table_cells_and_skips_hidden():
+    root = parse_html(f"<table><tr><td>a</td><td>b</td></tr><tr><td {HIDDEN_ATTRIBUTE}>x</td><td>c</td></tr></table>")
+    assert root.text() == "a b\nc"
+
+
+def test_table_strategies_use_descendant_cells():
+    data = extract_tab_snapshot(TAB_HTML)
+    assert data["Potenza (kW)"] == "999"
+    assert data["Stato"] == "In esercizio"
+
+
+def test_tab_table_strategy_uses_the_marked_element():
+    # Single-character keys are only accepted by strategy 1
+    assert extract_tab_snapshot(TAB_HTML)["N"] == "1"
+    unmarked = TAB_HTML.replace(TAB_TABLE_ATTRIBUTE, "data-other")
+    assert "N" not in extract_tab_snapshot(unmarked)
+
+
+def test_hidden_inputs_are_kept_for_strategy_3():
+    html = f"""
+    <div>
+      <div {HIDDEN_ATTRIBUTE}><label for="cap" {HIDDEN_ATTRIBUTE}>CAP</label><input id="cap" value=" 66034 "></div>
+      <div><label for="pod">POD</label><input id="pod" value="IT001"></div>
+      <input type="checkbox" id="flag" value="on">
+    </div>
+    """
+    data = extract_tab_snapshot(html)
+    # A hidden label has no text, the input id is used instead
+    assert data["cap"] == "66034"
+    assert data["POD"] == "IT001"
+    assert "flag" not in data
+
+
+def test_div_label_value_pattern():
+    data = extract_tab_snapshot("<div><div>Comune: LANCIANO</div></div>")
+    assert data["Comune"] == "LANCIANO"
+
+
+def test_parse_point():
+    assert parse_point("SRID=4326;POINT (14.39 42.23)") == ("POINT (14.39 42.23)", 14.39, 42.23)
+    assert parse_point("POINT (EMPTY)") == ("POINT (EMPTY)", None, None)
+    assert parse_point("") == ("", None, None)
+    assert parse_point(None) == ("", None, None)
+
+
+def test_parse_popup_snapshot_prefixes_fields_with_tab_label():
+    popup_data = parse_popup_snapshot({
+        "title": "Impianto 1",
+        "point_value": "POINT (1.5 2.5)",
+        "tabs": {"Dati Tecnici": TAB_HTML},
+    })
+    assert popup_data["title"] == "Impianto 1"
+    assert popup_data["table_data"]["Dati Tecnici_Potenza (kW)"] == "999"
+    assert (popup_data["coordinate_x"], popup_data["coordinate_y"]) == (1.5, 2.5)
+
+
+def test_pipeline_writes_records_and_calls_on_record(tmp_path):
+    emitted = []
+    pipeline = RecordPipeline(str(tmp_path), workers=2, on_record=emitted.append)
+    for click_number in (1, 2, 3):
+        snapshot = {"title": f"#{click_number}", "point_value": "", "tabs": {"Dati Tecnici": TAB_HTML}}
+        pipeline.submit(click_number, {"column_6": "BIOGAS"}, snapshot, {"commune": "LANCIANO"})
+    pipeline.close()
+
+    assert sorted(record["click_number"] for record in emitted) == [1, 2, 3]
+    assert pipeline.saved == 3
+    assert pipeline.errors == 0
+    with open(os.path.join(tmp_path, "record_0002.json"), encoding="utf-8") as f:
+        record = json.load(f)
+    assert record["popup_data"]["title"] == "#2"
+    assert record["filters_applied"] == {"commune": "LANCIANO"}
+
+
+def test_pipeline_reports_failed_records(tmp_path):
+    emitted = []
+    pipeline = RecordPipeline(str(tmp_path), workers=1, on_record=emitted.append)
+    pipeline.submit(1, {}, None, {})  # Not a snapshot dict, parsing fails
+    pipeline.submit(2, {}, {"tabs": {}}, {})
+    pipeline.close()
+
+    assert pipeline.failed == [1]
+    assert pipeline.errors == 1
+    assert [record["click_number"] for record in emitted] == [2]
+    assert not os.path.exists(os.path.join(tmp_path, "record_0001.json"))
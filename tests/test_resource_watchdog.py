@@ -0,0 +1,112 @@
+import pytest
+
+import resource_watchdog
+from resource_watchdog import ResourceWatchdog, load_checkpoint, save_checkpoint
+
+
+class FakeDriver:
+    def __init__(self, nodes=100, js_heap=None):
+        self.nodes = nodes
+        self.js_heap = js_heap
+
+    def execute_script(self, script, *args):
+        return {"nodes": self.nodes, "js_heap": self.js_heap}
+
+
+@pytest.fixture
+def memory(monkeypatch):
+    usage = {"python": 100.0, "chrome": 500.0}
+    monkeypatch.setattr(resource_watchdog, "_python_rss_mb", lambda: usage["python"])
+    monkeypatch.setattr(resource_watchdog, "_chrome_rss_mb", lambda driver: usage["chrome"])
+    return usage
+
+
+def run_records(watchdog, driver, count, seconds=1.0):
+    actions = []
+    for _ in range(count):
+        watchdog.record_latency(seconds)
+        actions = watchdog.check(driver)
+    return actions
+
+
+def test_samples_only_every_check_every_records(memory):
+    watchdog = ResourceWatchdog(max_dom_nodes=50, check_every=3)
+    driver = FakeDriver(nodes=100)
+
+    watchdog.record_latency(1.0)
+    assert not watchdog.sample_due
+    assert watchdog.check(driver) == []
+    assert run_records(watchdog, driver, 2) == ["page"]
+    assert watchdog.records_since_check == 0
+
+
+def test_no_action_under_the_limits(memory):
+    watchdog = ResourceWatchdog(check_every=1)
+    assert run_records(watchdog, FakeDriver(), 1) == []
+    assert watchdog.last_sample["dom_nodes"] == 100
+
+
+def test_python_memory_flush_is_reported_once(memory):
+    watchdog = ResourceWatchdog(max_python_rss_mb=50, check_every=1)
+    assert run_records(watchdog, FakeDriver(), 1) == ["flush"]
+    watchdog.notify_recycled("flush")
+    assert run_records(watchdog, FakeDriver(), 1) == []
+    assert watchdog.stats["flushes"] == 1
+
+
+def test_chrome_memory_restarts_the_browser(memory):
+    memory["chrome"] = 2000.0
+    watchdog = ResourceWatchdog(max_chrome_rss_mb=1500, check_every=1)
+    assert run_records(watchdog, FakeDriver(), 1) == ["browser"]
+
+
+def test_js_heap_reloads_the_page(memory):
+    watchdog = ResourceWatchdog(max_js_heap_mb=10, check_every=1)
+    assert run_records(watchdog, FakeDriver(js_heap=20 * 1024 * 1024), 1) == ["page"]
+
+
+def test_page_reloads_escalate_to_browser_restart(memory):
+    watchdog = ResourceWatchdog(max_dom_nodes=50, check_every=1, browser_recycle_after=3)
+    driver = FakeDriver(nodes=100)
+
+    assert run_records(watchdog, driver, 1) == ["page"]
+    watchdog.notify_recycled("page")
+    assert run_records(watchdog, driver, 1) == ["page"]
+    watchdog.notify_recycled("page")
+    assert run_records(watchdog, driver, 1) == ["browser"]
+    watchdog.notify_recycled("browser")
+    assert run_records(watchdog, driver, 1) == ["page"]
+    assert watchdog.stats == {"page_recycles": 2, "browser_restarts": 1, "flushes": 0}
+
+
+def test_latency_baseline_and_slowdown(memory):
+    watchdog = ResourceWatchdog(check_every=1, latency_window=4, max_latency_factor=2.0)
+    driver = FakeDriver()
+
+    assert run_records(watchdog, driver, 4, seconds=1.0) == []
+    assert watchdog.baseline_latency == 1.0
+    # The recent average has to fill the whole window before it counts
+    assert run_records(watchdog, driver, 2, seconds=5.0) == ["page"]
+
+    watchdog.notify_recycled("page")
+    assert watchdog.recent_latencies == []
+    assert watchdog.baseline_latency == 1.0
+
+
+def test_from_config():
+    watchdog = ResourceWatchdog.from_config({"check_every": 5, "max_dom_nodes": 1000})
+    assert watchdog.check_every == 5
+    assert watchdog.max_dom_nodes == 1000
+    assert ResourceWatchdog.from_config(None).check_every == 10
+
+
+def test_checkpoint_round_trip(tmp_path):
+    assert load_checkpoint(str(tmp_path)) is None
+    save_checkpoint(str(tmp_path), 12, 3400, {"b", "a"}, aggregates={"groups": {}}, records=11)
+
+    checkpoint = load_checkpoint(str(tmp_path))
+    assert checkpoint["total_clicks"] == 12
+    assert checkpoint["records"] == 11
+    assert checkpoint["scroll_top"] == 3400
+    assert checkpoint["processed_rows"] == {"a", "b"}
+    assert checkpoint["aggregates"] == {"groups": {}}
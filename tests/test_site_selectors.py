@@ -0,0 +1,120 @@
+import pytest
+
+from site_selectors import (CSS, HEALTH_CHECK_SCRIPT, SELECTOR_DEFINITIONS, XPATH, SelectorDriftError,
+                            SelectorMap, validate_definitions)
+
+
+DEFINITIONS = {
+    "panel": {"phase": "page", "css": "#panel", "xpath": '//*[@id="panel"]'},
+    "dialog": {"phase": "page", "optional": True, "css": ".dialog"},
+    "toolbar": {"phase": "choice", "css": "#toolbar_{n} > span", "defaults": {"n": 3}},
+    "row": {"phase": "grid", "css": "div.row"},
+}
+
+
+class FakeDriver:
+    """
+    Answers HEALTH_CHECK_SCRIPT with the index of the first strategy whose value is in `present`
+    """
+
+    session_id = "session-1"
+
+    def __init__(self, present):
+        self.present = set(present)
+        self.specs = None
+
+    def execute_script(self, script, specs):
+        assert script == HEALTH_CHECK_SCRIPT
+        self.specs = specs
+        result = {}
+        for name, strategies in specs:
+            matches = [index for index, (_, value) in enumerate(strategies) if value in self.present]
+            result[name] = matches[0] if matches else -1
+        return result
+
+
+def test_strategies_are_compiled_once_per_parameter_set():
+    selectors = SelectorMap(DEFINITIONS)
+    assert selectors.strategies("panel") == [(CSS, "#panel"), (XPATH, '//*[@id="panel"]')]
+    assert selectors.strategies("toolbar") == [(CSS, "#toolbar_3 > span")]
+    assert selectors.strategies("toolbar", n=5) == [(CSS, "#toolbar_5 > span")]
+    assert selectors.strategies("toolbar", n=5) is selectors.strategies("toolbar", n=5)
+    with pytest.raises(KeyError):
+        selectors.strategies("missing")
+
+
+def test_locator_defaults_to_css():
+    assert SelectorMap(DEFINITIONS).locator("panel") == (CSS, "#panel")
+
+
+def test_health_check_switches_locator_to_the_matching_fallback():
+    selectors = SelectorMap(DEFINITIONS)
+    report = selectors.health_check(FakeDriver(['//*[@id="panel"]', ".dialog"]), "page")
+
+    assert report == {"missing": [], "optional_missing": [], "fallback": ["panel"]}
+    assert selectors.locator("panel") == (XPATH, '//*[@id="panel"]')
+    assert "page" in selectors.checked_phases
+
+
+def test_health_check_separates_missing_and_optional():
+    selectors = SelectorMap(DEFINITIONS)
+    report = selectors.health_check(FakeDriver(["#panel"]), "page")
+    assert report["optional_missing"] == ["dialog"]
+
+    with pytest.raises(SelectorDriftError) as error:
+        selectors.health_check(FakeDriver([".dialog"]), ["page", "grid"])
+    assert error.value.missing == ["panel", "row"]
+    assert error.value.phase == "page+grid"
+    assert "grid" not in selectors.checked_phases
+
+
+def test_health_check_of_selected_selectors_with_params():
+    selectors = SelectorMap(DEFINITIONS)
+    driver = FakeDriver(["#toolbar_4 > span"])
+    selectors.health_check(driver, "choice", [("toolbar", {"n": 4})])
+    assert driver.specs == [["toolbar", [[CSS, "#toolbar_4 > span"]]]]
+    # A partial check does not mark the whole phase as checked
+    assert "choice" not in selectors.checked_phases
+
+
+def test_reset_session_forgets_checked_phases():
+    selectors = SelectorMap(DEFINITIONS)
+    selectors.health_check(FakeDriver(["#panel"]), "page")
+    selectors.reset_session()
+    assert selectors.checked_phases == set()
+
+
+def test_templated_selectors_need_defaults():
+    with pytest.raises(KeyError):
+        SelectorMap({"toolbar": {"phase": "choice", "css": "#toolbar_{n}"}}).strategies("toolbar")
+
+
+def test_selector_without_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        SelectorMap({"broken": {"phase": "page"}})
+
+
+def test_validate_definitions():
+    assert validate_definitions(SELECTOR_DEFINITIONS) == []
+    errors = validate_definitions({
+        "no_phase": {"css": "#a"},
+        "no_strategy": {"phase": "page"},
+        "bad_template": {"phase": "choice", "css": "#toolbar_{n}"},
+        "not_a_mapping": "#a",
+    })
+    assert errors == [
+        "Selector 'no_phase' has an unknown phase 'None'",
+        "Selector 'no_strategy' has neither a css nor an xpath strategy",
+        "Selector 'bad_template' css template is invalid: 'n'",
+        "Selector 'not_a_mapping' must be a mapping",
+    ]
+
+
+def test_from_file_overrides_default_definitions(tmp_path):
+    path = tmp_path / "selectors.json"
+    path.write_text('{"version": "2025.2", "selectors": {"grid_row": {"phase": "grid", "css": "tr.row"}}}',
+                    encoding="utf-8")
+    selectors = SelectorMap.from_file(str(path))
+    assert selectors.version == "2025.2"
+    assert selectors.locator("grid_row") == (CSS, "tr.row")
+    assert selectors.locator("grid_scrollbox") == SelectorMap().locator("grid_scrollbox")